@@ -0,0 +1,183 @@
+# Copyright © 2023 Michał Przybyś <michal@przybys.eu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software
+# and associated documentation files (the “Software”), to deal in the Software without
+# restriction, including without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+# BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from argparse import ArgumentParser, Namespace
+from aiohttp import ClientSession
+from asyncio import run
+from homeassistant.core import HomeAssistant
+from homeassistant.loader import async_setup as async_setup_loader
+from json import dumps
+from logging import WARNING, basicConfig
+from statistics import fmean, quantiles
+from tempfile import TemporaryDirectory
+from time import perf_counter, thread_time
+from tracemalloc import get_traced_memory, reset_peak, start, stop
+from typing import Any, Final
+from custom_components.ubus_advanced.const import (
+    CONF_DEVICE_PROVIDER,
+    CONF_NAME_PROVIDER,
+    CONF_NAME_REFRESH_INTERVAL,
+    CONF_RESPONSE_CACHE_TTL,
+    DEVICE_PROVIDER_HOSTAPD,
+    DEVICE_PROVIDER_IWINFO,
+    DOMAIN,
+    NAME_PROVIDER_DNSMASQ,
+    NAME_PROVIDER_LUCI
+)
+from custom_components.ubus_advanced.device_tracker import PLATFORM_SCHEMA, UbusAdvancedDeviceScanner
+from .fake_ubus import FakeUbusConfig, FakeUbusServer
+
+SCENARIOS: Final[dict[str, FakeUbusConfig]] = {
+    '1x20': FakeUbusConfig(interfaces=1, clients=20),
+    '8x500': FakeUbusConfig(interfaces=8, clients=500),
+    '20k-leases': FakeUbusConfig(interfaces=1, clients=20, leases=20000, lease_churn=True)
+}
+
+async def _see(**_: Any) -> None:
+    pass
+
+async def _server_calls(session: ClientSession, url: str) -> int:
+    async with session.get(f'{url}/stats') as response:
+        return (await response.json())['calls']
+
+async def _run_scans(hass: HomeAssistant, server: FakeUbusServer, stats_session: ClientSession,
+        arguments: Namespace, iterations: int, trace: bool) -> list[dict[str, Any]]:
+    # Every run starts with a fresh ubus client instead of one shared through hass.data
+    hass.data.pop(DOMAIN, None)
+    scanner = UbusAdvancedDeviceScanner(hass, PLATFORM_SCHEMA({
+        'platform': 'ubus_advanced',
+        'host': server.url,
+        'username': 'benchmark',
+        'password': 'benchmark',
+        CONF_DEVICE_PROVIDER: arguments.device_provider,
+        CONF_NAME_PROVIDER: arguments.name_provider,
+        CONF_NAME_REFRESH_INTERVAL: arguments.name_refresh_interval,
+        CONF_RESPONSE_CACHE_TTL: 0
+    }), _see)
+    ubus_client = scanner.ubus_clients[0]
+
+    scans = []
+    if trace:
+        start()
+    for _ in range(iterations + 1):
+        calls = await _server_calls(stats_session, server.url)
+        requests = ubus_client.metrics.requests
+        response_bytes = ubus_client.metrics.total_response_bytes
+        if trace:
+            memory, _ = get_traced_memory()
+            reset_peak()
+
+        wall_start, cpu_start = perf_counter(), thread_time()
+        devices = await scanner.async_scan_devices()
+        for mac in devices:
+            await scanner.async_get_device_name(mac)
+            await scanner.async_get_extra_attributes(mac)
+        wall, cpu = perf_counter() - wall_start, thread_time() - cpu_start
+
+        scans.append({
+            'devices': len(devices),
+            'latency': wall,
+            'cpu': cpu,
+            'peak_memory': get_traced_memory()[1] - memory if trace else 0,
+            'rpc_calls': await _server_calls(stats_session, server.url) - calls,
+            'http_requests': ubus_client.metrics.requests - requests,
+            'response_bytes': ubus_client.metrics.total_response_bytes - response_bytes
+        })
+    if trace:
+        stop()
+
+    await scanner.async_stop()
+    return scans
+
+async def run_scenario(name: str, config: FakeUbusConfig, arguments: Namespace) -> dict[str, Any]:
+    with FakeUbusServer(config) as server, TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        async_setup_loader(hass)
+        async with ClientSession() as stats_session:
+            # tracemalloc slows down every allocation, so memory is measured in separate scans
+            scans = await _run_scans(hass, server, stats_session, arguments, arguments.iterations, False)
+            traced = await _run_scans(hass, server, stats_session, arguments, min(arguments.iterations, 3), True)
+        await hass.async_stop(force=True)
+
+    scans[0]['peak_memory'] = traced[0]['peak_memory']
+
+    cold, warm = scans[0], scans[1:]
+    return {
+        'scenario': name,
+        'devices': cold['devices'],
+        'cold': cold,
+        'warm': {
+            'latency_mean': fmean(scan['latency'] for scan in warm),
+            'latency_p95': quantiles([scan['latency'] for scan in warm], n=20)[-1] if len(warm) > 1 else warm[0]['latency'],
+            'cpu_mean': fmean(scan['cpu'] for scan in warm),
+            'peak_memory': max(scan['peak_memory'] for scan in traced[1:]),
+            'rpc_calls': fmean(scan['rpc_calls'] for scan in warm),
+            'http_requests': fmean(scan['http_requests'] for scan in warm),
+            'response_bytes': fmean(scan['response_bytes'] for scan in warm)
+        }
+    }
+
+def print_results(results: list[dict[str, Any]]) -> None:
+    print(f'{"scenario":<12}{"phase":<6}{"devices":>8}{"latency ms":>12}{"p95 ms":>9}{"cpu ms":>9}'
+        f'{"peak KiB":>10}{"rpc":>7}{"http":>6}{"resp KiB":>10}')
+    for result in results:
+        cold, warm = result['cold'], result['warm']
+        print(f'{result["scenario"]:<12}{"cold":<6}{result["devices"]:>8}{cold["latency"] * 1000:>12.2f}{"":>9}'
+            f'{cold["cpu"] * 1000:>9.2f}{cold["peak_memory"] / 1024:>10.1f}{cold["rpc_calls"]:>7}'
+            f'{cold["http_requests"]:>6}{cold["response_bytes"] / 1024:>10.1f}')
+        print(f'{"":<12}{"warm":<6}{result["devices"]:>8}{warm["latency_mean"] * 1000:>12.2f}'
+            f'{warm["latency_p95"] * 1000:>9.2f}{warm["cpu_mean"] * 1000:>9.2f}{warm["peak_memory"] / 1024:>10.1f}'
+            f'{warm["rpc_calls"]:>7.0f}{warm["http_requests"]:>6.0f}{warm["response_bytes"] / 1024:>10.1f}')
+
+async def main(arguments: Namespace) -> None:
+    results = []
+    for name in arguments.scenarios or SCENARIOS:
+        config = SCENARIOS[name]
+        if arguments.latency is not None:
+            config = config._replace(latency=arguments.latency / 1000)
+
+        result = await run_scenario(name, config, arguments)
+        # Only devices with a name are tracked, so this also catches a name provider that failed
+        if not result['devices']:
+            raise SystemExit(f'Scenario {name} found no devices')
+
+        results.append(result)
+
+    if arguments.json:
+        print(dumps(results, indent=2))
+    else:
+        print_results(results)
+
+if __name__ == '__main__':
+    parser = ArgumentParser(prog='python -m benchmark', description='Benchmark device scans against a fake ubus server')
+    parser.add_argument('--scenario', dest='scenarios', action='append', choices=list(SCENARIOS),
+        help='Scenario to run, can be given multiple times (default: all)')
+    parser.add_argument('--iterations', type=int, default=20, help='Number of warm scans after the first one')
+    parser.add_argument('--latency', type=float, help='Latency in milliseconds added to every HTTP request')
+    parser.add_argument('--device-provider', choices=[DEVICE_PROVIDER_HOSTAPD, DEVICE_PROVIDER_IWINFO],
+        default=DEVICE_PROVIDER_HOSTAPD)
+    parser.add_argument('--name-provider', choices=[NAME_PROVIDER_DNSMASQ, NAME_PROVIDER_LUCI],
+        default=NAME_PROVIDER_DNSMASQ)
+    parser.add_argument('--name-refresh-interval', type=float, default=0,
+        help='Seconds between name refreshes when no devices changed (default: refresh on every scan)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    arguments = parser.parse_args()
+    if arguments.iterations < 1:
+        parser.error('--iterations must be at least 1')
+
+    basicConfig(level=WARNING)
+    run(main(arguments))
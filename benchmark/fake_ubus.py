@@ -0,0 +1,228 @@
+# Copyright © 2023 Michał Przybyś <michal@przybys.eu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software
+# and associated documentation files (the “Software”), to deal in the Software without
+# restriction, including without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+# BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from aiohttp import web
+from asyncio import sleep
+from json import dumps, loads
+from multiprocessing import get_context
+from multiprocessing.connection import Connection
+from socket import socket
+from typing import Any, NamedTuple
+
+SESSION_ID = '0123456789abcdef0123456789abcdef'
+LEASEFILE_PATH = '/tmp/dhcp.leases'
+
+class FakeUbusConfig(NamedTuple):
+    interfaces: int = 1
+    clients: int = 20
+    leases: int | None = None
+    latency: float = 0.0
+    lease_churn: bool = False
+    event_interval: float = 0.0
+
+def mac(index: int) -> str:
+    return f'02:00:{(index >> 24) & 0xff:02x}:{(index >> 16) & 0xff:02x}:{(index >> 8) & 0xff:02x}:{index & 0xff:02x}'
+
+def client(index: int) -> dict[str, Any]:
+    return {
+        'auth': True,
+        'assoc': True,
+        'authorized': index % 10 != 9,
+        'preauth': False,
+        'wds': False,
+        'wmm': True,
+        'ht': True,
+        'vht': True,
+        'he': False,
+        'wps': False,
+        'mfp': False,
+        'rrm': [0, 0, 0, 0, 0],
+        'extended_capabilities': [0, 0, 0, 0, 0, 0, 0, 64],
+        'aid': index % 2008 + 1,
+        'signature': 'wifi4|probe:0,1,50,3,45,221(0050f2,8),htcap:01ef,htagg:17,htmcs:0000ffff|assoc:0,1,50,33,36,48,45,221(0050f2,2),htcap:01ef,htagg:17,htmcs:0000ffff',
+        'bytes': {'rx': 1000 * index, 'tx': 2000 * index},
+        'airtime': {'rx': 10 * index, 'tx': 20 * index},
+        'packets': {'rx': index, 'tx': 2 * index},
+        'rate': {'rx': 866700, 'tx': 780000},
+        'signal': -40 - index % 50,
+        'capabilities': {
+            'vht': {'su_beamformee': True, 'mu_beamformee': False, 'mcs_map': {
+                'rx': {'1ss': 9, '2ss': 9, '3ss': -1, '4ss': -1},
+                'tx': {'1ss': 9, '2ss': 9, '3ss': -1, '4ss': -1}
+            }}
+        }
+    }
+
+class FakeUbus:
+    def __init__(self, config: FakeUbusConfig):
+        self._config = config
+        self._hostapds = {f'hostapd.wlan{interface}': f'Network {interface}' for interface in range(config.interfaces)}
+        self._clients = {hostapd: {mac(index): client(index) for index
+            in range(interface * config.clients, (interface + 1) * config.clients)}
+            for interface, hostapd in enumerate(self._hostapds)}
+        # Subscriptions take the first client of their interface off and back on every event_interval
+        self._roaming = {hostapd: (mac(interface * config.clients), client(interface * config.clients))
+            for interface, hostapd in enumerate(self._hostapds) if config.clients}
+
+        leases = config.leases if config.leases is not None else config.interfaces * config.clients
+        self._leasefile = 'duid 00:01:00:01:2c:5f:7a:1b:02:00:00:00:00:01\n' + ''.join(f'{1700000000 + index} {mac(index)} 10.{(index >> 16) & 0xff}.{(index >> 8) & 0xff}.'
+            f'{index & 0xff} host-{index} 01:{mac(index)}\n' for index in range(leases))
+        self._mtime = 1700000000
+
+        self.calls = 0
+        self.posts = 0
+        self.response_bytes = 0
+
+    def application(self) -> web.Application:
+        application = web.Application()
+        application.router.add_post('/ubus', self._handle_ubus)
+        application.router.add_get('/ubus/subscribe/{subsystem}', self._handle_subscribe)
+        application.router.add_get('/stats', self._handle_stats)
+
+        return application
+
+    async def _handle_ubus(self, request: web.Request) -> web.Response:
+        if self._config.latency:
+            await sleep(self._config.latency)
+
+        payload = loads(await request.read())
+        if isinstance(payload, list):
+            response: Any = [self._handle_rpc(item) for item in payload]
+        else:
+            response = self._handle_rpc(payload)
+
+        body = dumps(response)
+        self.posts += 1
+        self.response_bytes += len(body)
+
+        return web.Response(text=body, content_type='application/json')
+
+    async def _handle_subscribe(self, request: web.Request) -> web.StreamResponse:
+        if request.headers.get('Authorization') != f'Bearer {SESSION_ID}':
+            return web.Response(status=403)
+        hostapd = request.match_info['subsystem']
+        if hostapd not in self._roaming:
+            return web.Response(status=404)
+
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        # Like uhttpd, nothing is sent while there are no events
+        client_mac, client_data = self._roaming[hostapd]
+        while True:
+            await sleep(self._config.event_interval or 3600)
+            if not self._config.event_interval:
+                continue
+
+            clients = self._clients[hostapd]
+            if clients.pop(client_mac, None) is not None:
+                events = ['disassoc']
+            else:
+                clients[client_mac] = client_data
+                events = ['assoc', 'sta-authorized']
+            try:
+                for event in events:
+                    await response.write(f'event: {event}\ndata: {dumps({"address": client_mac})}\n\n'.encode())
+            except ConnectionResetError:
+                return response
+
+    async def _handle_stats(self, _: web.Request) -> web.Response:
+        return web.json_response({'calls': self.calls, 'posts': self.posts, 'response_bytes': self.response_bytes})
+
+    def _handle_rpc(self, item: dict[str, Any]) -> dict[str, Any]:
+        self.calls += 1
+        method, params = item['method'], item['params']
+        if method == 'call' and params[1:3] == ['session', 'login']:
+            return self._result(item, [0, {'ubus_rpc_session': SESSION_ID, 'timeout': 300, 'expires': 300}])
+        if params[0] != SESSION_ID:
+            return self._error(item, -32002, 'Access denied')
+
+        if method == 'list':
+            return self._result(item, {hostapd: {'get_status': {}, 'get_clients': {}} for hostapd in self._hostapds})
+
+        subsystem, ubus_method, arguments = params[1], params[2], params[3]
+        if subsystem in self._hostapds and ubus_method == 'get_status':
+            return self._result(item, [0, {'ssid': self._hostapds[subsystem], 'channel': 36, 'status': 'ENABLED'}])
+        if subsystem in self._hostapds and ubus_method == 'get_clients':
+            return self._result(item, [0, {'freq': 5180, 'clients': self._clients[subsystem]}])
+        if subsystem == 'iwinfo' and ubus_method == 'assoclist':
+            hostapd = f'hostapd.{arguments.get("device")}'
+            if hostapd not in self._clients:
+                return self._result(item, [2])
+
+            return self._result(item, [0, {'results': [{'mac': client_mac.upper(), **client_data}
+                for client_mac, client_data in self._clients[hostapd].items()]}])
+        if subsystem == 'luci-rpc' and ubus_method == 'getWirelessDevices':
+            return self._result(item, [0, {'radio0': {'up': True, 'interfaces': [{'section': f'default_radio{index}',
+                'ifname': hostapd.split('.', 1)[1], 'config': {'mode': 'ap', 'ssid': ssid}, 'iwinfo': {'ssid': ssid}}
+                for index, (hostapd, ssid) in enumerate(self._hostapds.items())]}}])
+        if subsystem == 'luci-rpc' and ubus_method == 'getDHCPLeases':
+            # Like LuCI, only lease lines are returned, the duid line is skipped
+            return self._result(item, [0, {'dhcp_leases': [{'macaddr': lease[1], 'hostname': lease[3], 'ipaddr': lease[2]}
+                for lease in (line.split(' ') for line in self._leasefile.splitlines()) if lease[0] != 'duid']}])
+        if subsystem == 'uci' and ubus_method == 'get':
+            return self._result(item, [0, {'values': {'cfg01411c': {'.type': 'dnsmasq', 'leasefile': LEASEFILE_PATH}}}])
+        if subsystem == 'file' and ubus_method == 'stat' and arguments.get('path') == LEASEFILE_PATH:
+            if self._config.lease_churn:
+                self._mtime += 1
+
+            return self._result(item, [0, {'path': LEASEFILE_PATH, 'type': 'file', 'size': len(self._leasefile),
+                'mtime': self._mtime}])
+        if subsystem == 'file' and ubus_method == 'read' and arguments.get('path') == LEASEFILE_PATH:
+            return self._result(item, [0, {'data': self._leasefile}])
+        if subsystem == 'file':
+            return self._result(item, [4])
+
+        return self._error(item, -32000, 'Object not found')
+
+    def _result(self, item: dict[str, Any], result: Any) -> dict[str, Any]:
+        return {'jsonrpc': '2.0', 'id': item['id'], 'result': result}
+
+    def _error(self, item: dict[str, Any], code: int, message: str) -> dict[str, Any]:
+        return {'jsonrpc': '2.0', 'id': item['id'], 'error': {'code': code, 'message': message}}
+
+def _serve(config: FakeUbusConfig, connection: Connection) -> None:
+    async def on_startup(application: web.Application) -> None:
+        connection.send(application['port'])
+
+    fake_ubus = FakeUbus(config)
+    application = fake_ubus.application()
+    application.on_startup.append(on_startup)
+
+    sock = socket()
+    sock.bind(('127.0.0.1', 0))
+    sock.listen()
+    application['port'] = sock.getsockname()[1]
+    # Subscriptions never end on their own, so they are not waited for on shutdown
+    web.run_app(application, sock=sock, print=None, handle_signals=True, shutdown_timeout=0.1)
+
+class FakeUbusServer:
+    def __init__(self, config: FakeUbusConfig):
+        self._config = config
+        self._process: Any = None
+        self.url = ''
+
+    def __enter__(self) -> 'FakeUbusServer':
+        context = get_context('spawn')
+        receiver, sender = context.Pipe(duplex=False)
+        self._process = context.Process(target=_serve, args=(self._config, sender), daemon=True)
+        self._process.start()
+        self.url = f'http://127.0.0.1:{receiver.recv()}'
+
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self._process.terminate()
+        self._process.join()
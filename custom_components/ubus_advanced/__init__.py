@@ -15,3 +15,16 @@
 # DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 '''Home Assistant device tracker which uses OpenWRT's ubus.'''
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import config_validation
+from homeassistant.helpers.typing import ConfigType
+from typing import Final
+from .const import DATA_HASS_CONFIG, DOMAIN
+
+CONFIG_SCHEMA: Final = config_validation.platform_only_config_schema(DOMAIN)
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    # Platforms loaded by trackers need the whole Home Assistant configuration
+    hass.data.setdefault(DOMAIN, {})[DATA_HASS_CONFIG] = config
+
+    return True
@@ -0,0 +1,76 @@
+# Copyright © 2023 Michał Przybyś <michal@przybys.eu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software
+# and associated documentation files (the “Software”), to deal in the Software without
+# restriction, including without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+# BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from logging import Logger
+from typing import Iterable
+from .model import Device
+
+def mac_to_int(mac: str) -> int:
+    return int(mac.replace(':', ''), 16)
+
+class Client:
+    __slots__ = ('mac', 'ssid', 'name', 'generation')
+
+    def __init__(self, mac: str, ssid: str, name: str, generation: int):
+        self.mac = mac
+        self.ssid = ssid
+        self.name = name
+        self.generation = generation
+
+class ClientStore:
+    def __init__(self, logger: Logger):
+        self._logger = logger.getChild('ClientStore')
+
+        self._clients: dict[int, Client] = {}
+        self._generation = 0
+        self._macs: list[str] = []
+        self.joined: list[str] = []
+        self.left: list[str] = []
+
+    @property
+    def macs(self) -> list[str]:
+        return self._macs
+
+    def get(self, mac: str) -> Client | None:
+        return self._clients.get(mac_to_int(mac))
+
+    def keep(self) -> None:
+        self.joined = []
+        self.left = []
+
+    def update(self, clients: Iterable[tuple[Device, str]]) -> None:
+        self._generation += 1
+        generation = self._generation
+        joined = []
+        for device, name in clients:
+            key = mac_to_int(device.mac)
+            client = self._clients.get(key)
+            if client is None:
+                self._clients[key] = Client(device.mac, device.ssid, name, generation)
+                joined.append(device.mac)
+                continue
+
+            client.ssid = device.ssid
+            client.name = name
+            client.generation = generation
+
+        left = [key for key, client in self._clients.items() if client.generation != generation]
+        self.joined = joined
+        self.left = [self._clients.pop(key).mac for key in left]
+
+        if joined or left:
+            self._logger.debug(f'{len(joined)} clients joined, {len(left)} clients left')
+            self._macs = [client.mac for client in self._clients.values()]
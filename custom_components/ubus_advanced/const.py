@@ -16,6 +16,24 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 from typing import Final
 
+DOMAIN: Final[str] = 'ubus_advanced'
+DATA_HASS_CONFIG: Final[str] = 'hass_config'
+DATA_SCANNERS: Final[str] = 'scanners'
+DATA_SENSOR_UBUS_CLIENTS: Final[str] = 'sensor_ubus_clients'
+DATA_UBUS_CLIENTS: Final[str] = 'ubus_clients'
+ATTR_SCANNER_ID: Final[str] = 'scanner_id'
+
+CONF_ROUTERS: Final[str] = 'routers'
+CONF_ROUTER_ROLE: Final[str] = 'role'
+ROUTER_ROLE_BOTH: Final[str] = 'both'
+ROUTER_ROLE_DEVICE: Final[str] = 'device'
+ROUTER_ROLE_NAME: Final[str] = 'name'
+ROUTER_ROLES: Final[list[str]] = [
+    ROUTER_ROLE_BOTH,
+    ROUTER_ROLE_DEVICE,
+    ROUTER_ROLE_NAME
+]
+
 CONF_MAC_BLACKLIST: Final[str] = 'mac_blacklist'
 CONF_MAC_WHITELIST: Final[str] = 'mac_whitelist'
 CONF_NAME_BLACKLIST: Final[str] = 'name_blacklist'
@@ -23,14 +41,30 @@ CONF_NAME_WHITELIST: Final[str] = 'name_whitelist'
 CONF_SSID_BLACKLIST: Final[str] = 'ssid_blacklist'
 CONF_SSID_WHITELIST: Final[str] = 'ssid_whitelist'
 
+CONF_MAX_CONCURRENT_REQUESTS: Final[str] = 'max_concurrent_requests'
+CONF_RESPONSE_CACHE_TTL: Final[str] = 'response_cache_ttl'
+CONF_TOPOLOGY_REFRESH_INTERVAL: Final[str] = 'topology_refresh_interval'
+CONF_LEASEFILE_REFRESH_INTERVAL: Final[str] = 'leasefile_refresh_interval'
+CONF_RECONCILIATION_INTERVAL: Final[str] = 'reconciliation_interval'
+CONF_SENSORS: Final[str] = 'sensors'
+CONF_DELTA_REPORTING: Final[str] = 'delta_reporting'
+CONF_MAX_SCAN_INTERVAL: Final[str] = 'max_interval_seconds'
+CONF_NAME_REFRESH_INTERVAL: Final[str] = 'name_refresh_interval'
+
 CONF_DEVICE_PROVIDER: Final[str] = 'device_provider'
 DEVICE_PROVIDER_HOSTAPD: Final[str] = 'hostapd'
+DEVICE_PROVIDER_HOSTAPD_SUBSCRIPTION: Final[str] = 'hostapd_subscription'
+DEVICE_PROVIDER_IWINFO: Final[str] = 'iwinfo'
 DEVICE_PROVIDERS: Final[list[str]] = [
-    DEVICE_PROVIDER_HOSTAPD
+    DEVICE_PROVIDER_HOSTAPD,
+    DEVICE_PROVIDER_HOSTAPD_SUBSCRIPTION,
+    DEVICE_PROVIDER_IWINFO
 ]
 
 CONF_NAME_PROVIDER: Final[str] = 'name_provider'
 NAME_PROVIDER_DNSMASQ: Final[str] = 'dnsmasq'
+NAME_PROVIDER_LUCI: Final[str] = 'luci'
 NAME_PROVIDERS: Final[list[str]] = [
-    NAME_PROVIDER_DNSMASQ
+    NAME_PROVIDER_DNSMASQ,
+    NAME_PROVIDER_LUCI
 ]
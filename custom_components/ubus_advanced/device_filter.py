@@ -0,0 +1,112 @@
+# Copyright © 2023 Michał Przybyś <michal@przybys.eu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software
+# and associated documentation files (the “Software”), to deal in the Software without
+# restriction, including without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+# BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from fnmatch import translate
+from logging import Logger
+from re import Pattern, compile
+from typing import Final, Iterable, Iterator
+from .model import Device, Name
+
+VERDICT_CACHE_SIZE: Final[int] = 65536
+
+class DeviceFilter:
+    def __init__(self, logger: Logger, mac_blacklist: list[str], mac_whitelist: list[str], name_blacklist: list[str],
+            name_whitelist: list[str], ssid_blacklist: list[str], ssid_whitelist: list[str]):
+        self._logger = logger.getChild('DeviceFilter')
+
+        self._mac_blacklist = frozenset(mac.upper() for mac in mac_blacklist)
+        self._mac_whitelist = frozenset(mac.upper() for mac in mac_whitelist)
+        self._name_blacklist = self._compile(name_blacklist)
+        self._name_whitelist = self._compile(name_whitelist)
+        self._ssid_blacklist = frozenset(ssid_blacklist)
+        self._ssid_whitelist = frozenset(ssid_whitelist)
+
+        self._device_verdicts: dict[Device, bool] = {}
+        self._name_verdicts: dict[str, bool] = {}
+        self.unnamed: set[str] = set()
+
+    def join(self, devices: Iterable[Device], names: Iterable[Name]) -> Iterator[tuple[Device, str]]:
+        names_by_mac = {name.mac: name for name in names}
+
+        unnamed = set()
+        for device in devices:
+            if not self._filter_device(device):
+                continue
+
+            name = names_by_mac.get(device.mac)
+            if name is None:
+                unnamed.add(device.mac)
+                continue
+            if not self._filter_name(name):
+                continue
+
+            yield device, name.name
+
+        self.unnamed = unnamed
+
+    def _filter_device(self, device: Device) -> bool:
+        verdict = self._device_verdicts.get(device)
+        if verdict is None:
+            if len(self._device_verdicts) >= VERDICT_CACHE_SIZE:
+                self._device_verdicts.clear()
+
+            verdict = self._device_verdicts[device] = self._evaluate_device(device)
+
+        return verdict
+
+    def _filter_name(self, name: Name) -> bool:
+        verdict = self._name_verdicts.get(name.name)
+        if verdict is None:
+            if len(self._name_verdicts) >= VERDICT_CACHE_SIZE:
+                self._name_verdicts.clear()
+
+            verdict = self._name_verdicts[name.name] = self._evaluate_name(name)
+
+        return verdict
+
+    def _evaluate_device(self, device: Device) -> bool:
+        if self._mac_whitelist and device.mac not in self._mac_whitelist:
+            self._logger.debug(f'Device {device} was not found on MAC address whitelist, ignoring')
+            return False
+        if self._mac_blacklist and device.mac in self._mac_blacklist:
+            self._logger.debug(f'Device {device} was found on MAC address blacklist, ignoring')
+            return False
+
+        if self._ssid_whitelist and device.ssid not in self._ssid_whitelist:
+            self._logger.debug(f'Device {device} was not found on SSID whitelist, ignoring')
+            return False
+        if self._ssid_blacklist and device.ssid in self._ssid_blacklist:
+            self._logger.debug(f'Device {device} was found on SSID blacklist, ignoring')
+            return False
+
+        return True
+
+    def _evaluate_name(self, name: Name) -> bool:
+        if self._name_whitelist and not self._name_whitelist.match(name.name):
+            self._logger.debug(f'Name {name} was not found on name whitelist, ignoring')
+            return False
+        if self._name_blacklist and self._name_blacklist.match(name.name):
+            self._logger.debug(f'Name {name} was found on name blacklist, ignoring')
+            return False
+
+        return True
+
+    @staticmethod
+    def _compile(patterns: list[str]) -> Pattern[str] | None:
+        if not patterns:
+            return None
+
+        return compile('|'.join(f'(?:{translate(pattern)})' for pattern in patterns))
@@ -14,8 +14,14 @@
 # NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
 # DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from .base_device_provider import BaseDeviceProvider
 from .hostapd_device_provider import HostapdDeviceProvider
+from .hostapd_subscription_device_provider import HostapdSubscriptionDeviceProvider
+from .iwinfo_device_provider import IwinfoDeviceProvider
 
 __all__ = [
-    'HostapdDeviceProvider'
+    'BaseDeviceProvider',
+    'HostapdDeviceProvider',
+    'HostapdSubscriptionDeviceProvider',
+    'IwinfoDeviceProvider'
 ]
@@ -15,9 +15,16 @@
 # DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 from abc import ABC, abstractmethod
+from typing import Callable
 from ..model import Device
 
 class BaseDeviceProvider(ABC):
     @abstractmethod
-    def get(self) -> list[Device]:
+    async def get(self) -> list[Device]:
+        pass
+
+    async def start(self, on_change: Callable[[], None]) -> None:
+        pass
+
+    async def stop(self) -> None:
         pass
@@ -14,10 +14,13 @@
 # NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
 # DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from asyncio import gather
+from datetime import timedelta
 from logging import Logger
-from typing import NamedTuple
+from time import monotonic
+from typing import Any, NamedTuple, Sequence
 from ..model import Device
-from ..ubus_client import UbusClient
+from ..ubus_client import UbusCall, UbusClient, UbusObjectNotFoundError
 from .base_device_provider import BaseDeviceProvider
 
 class Network(NamedTuple):
@@ -25,42 +28,107 @@ class Network(NamedTuple):
     ssid: str
 
 class HostapdDeviceProvider(BaseDeviceProvider):
-    def __init__(self, logger: Logger, ubus_client: UbusClient):
+    def __init__(self, logger: Logger, ubus_client: UbusClient, topology_refresh_interval: timedelta):
         self._logger = logger.getChild('HostapdDeviceProvider')
         self._ubus_client = ubus_client
+        self._topology_refresh_interval = topology_refresh_interval.total_seconds()
 
-    def get(self) -> list[Device]:
+        self._hostapds: set[str] = set()
+        self._networks: list[Network] | None = None
+        self._networks_expiry = 0.0
+
+    async def get(self) -> list[Device]:
         self._logger.debug('Loading data')
-        networks = self._get_networks()
+        if self._networks is None:
+            networks = await self._get_networks(await self._ubus_client.list('hostapd.*'))
+            return self._get_devices(networks, await self._get_clients(networks))
+
+        networks = self._networks
+        self._logger.debug(f'Getting clients of {len(networks)} Wi-Fi networks')
+        hostapds, responses = await gather(self._ubus_client.list('hostapd.*'), self._get_clients(networks),
+            return_exceptions=True)
+        if isinstance(responses, BaseException):
+            raise responses
+
+        if isinstance(hostapds, BaseException):
+            if all(isinstance(response, BaseException) for response in responses):
+                raise hostapds
+
+            self._logger.warning(f'Could not get Wi-Fi networks, using cached ones: {hostapds}')
+        elif self._topology_changed(hostapds, responses):
+            self._logger.info('Wi-Fi networks changed, refreshing')
+            networks, responses = await self._refresh_networks(hostapds, networks, responses)
+        elif monotonic() >= self._networks_expiry:
+            self._logger.debug('Wi-Fi networks expired, refreshing')
+            networks, responses = await self._refresh_networks(hostapds, networks, responses)
+
+        return self._get_devices(networks, responses)
+
+    async def _get_clients(self, networks: list[Network]) -> Sequence[Any]:
+        return await self._ubus_client.batch([UbusCall(network.hostapd, 'get_clients', projection=self._project_clients)
+            for network in networks], return_exceptions=True, isolated=True)
+
+    @staticmethod
+    def _project_clients(response: dict[str, Any]) -> dict[str, bool]:
+        return {mac: client['authorized'] for mac, client in response['clients'].items()}
+
+    def _topology_changed(self, hostapds: dict[str, Any], responses: Sequence[Any]) -> bool:
+        return hostapds.keys() != self._hostapds \
+            or any(isinstance(response, UbusObjectNotFoundError) for response in responses)
 
-        return self._get_devices(networks)
+    async def _refresh_networks(self, hostapds: dict[str, Any], networks: list[Network],
+            responses: Sequence[Any]) -> tuple[list[Network], list[Any]]:
+        # Clients already fetched in this scan are reused, only new networks are asked for theirs
+        fetched = {network.hostapd: response for network, response in zip(networks, responses)
+            if not isinstance(response, UbusObjectNotFoundError)}
+        networks = await self._get_networks(hostapds)
+        missing = [network for network in networks if network.hostapd not in fetched]
+        fetched.update(zip((network.hostapd for network in missing), await self._get_clients(missing)))
 
-    def _get_networks(self) -> list[Network]:
+        return networks, [fetched[network.hostapd] for network in networks]
+
+    async def _get_networks(self, hostapds: dict[str, Any]) -> list[Network]:
         self._logger.debug('Getting Wi-Fi networks')
-        hostapds = self._ubus_client.list('hostapd.*').keys()
+        statuses = await self._ubus_client.batch([UbusCall(hostapd, 'get_status') for hostapd in hostapds],
+            return_exceptions=True, isolated=True)
 
         networks = []
-        for hostapd in hostapds:
-            self._logger.debug(f'Getting SSID of network {hostapd}')
-            ssid = self._ubus_client.call(hostapd, 'get_status')['ssid']
+        for hostapd, status in zip(hostapds, statuses):
+            if isinstance(status, BaseException):
+                self._logger.warning(f'Could not get status of network {hostapd}, ignoring: {status}')
+                continue
+
+            networks.append(Network(hostapd, status['ssid']))
 
-            networks.append(Network(hostapd, ssid))
+        # Networks without status are left out, so the next scan sees them as new and retries
+        self._hostapds = {network.hostapd for network in networks}
+        self._networks = networks
+        self._networks_expiry = monotonic() + self._topology_refresh_interval
 
         self._logger.debug(f'Got {networks} Wi-Fi networks')
         return networks
 
-    def _get_devices(self, networks: list[Network]) -> list[Device]:
+    def _get_devices(self, networks: list[Network], responses: Sequence[Any]) -> list[Device]:
         self._logger.debug('Getting devices')
         devices = []
-        for network in networks:
-            self._logger.debug(f'Getting {network.hostapd} network\'s clients')
-            clients = self._ubus_client.call(network.hostapd, 'get_clients')['clients']
-            for mac in clients:
-                if not clients[mac]['authorized']:
-                    self._logger.debug(f'Client {mac} not authorized, ignoring')
-                    continue
+        for network, response in zip(networks, responses):
+            if isinstance(response, BaseException):
+                self._logger.warning(f'Could not get clients of network {network.hostapd}, ignoring: {response}')
+                continue
+
+            devices.extend(self._get_network_devices(network, response))
+
+        self._logger.debug(f'Got {len(devices)} devices')
+        return devices
+
+    def _get_network_devices(self, network: Network, clients: dict[str, bool]) -> list[Device]:
+        self._logger.debug(f'Processing {network.hostapd} network\'s clients')
+        devices = []
+        for mac, authorized in clients.items():
+            if not authorized:
+                self._logger.debug(f'Client {mac} not authorized, ignoring')
+                continue
 
-                devices.append(Device(mac.upper(), network.ssid))
+            devices.append(Device(mac.upper(), network.ssid))
 
-        self._logger.debug(f'Got {devices} devices')
         return devices
@@ -0,0 +1,152 @@
+# Copyright © 2023 Michał Przybyś <michal@przybys.eu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software
+# and associated documentation files (the “Software”), to deal in the Software without
+# restriction, including without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+# BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from asyncio import Task, create_task, sleep
+from datetime import timedelta
+from logging import Logger
+from time import monotonic
+from typing import Any, Callable, Final, Sequence
+from ..model import Device
+from ..ubus_client import UbusClient, UbusEvent
+from .hostapd_device_provider import HostapdDeviceProvider, Network
+
+EVENT_ASSOC: Final[str] = 'assoc'
+EVENT_AUTHORIZED: Final[str] = 'sta-authorized'
+EVENT_DISASSOC: Final[str] = 'disassoc'
+SUBSCRIPTION_BACKOFF_MAX: Final[float] = 300.0
+SUBSCRIPTION_BACKOFF_MIN: Final[float] = 5.0
+
+class HostapdSubscriptionDeviceProvider(HostapdDeviceProvider):
+    def __init__(self, logger: Logger, ubus_client: UbusClient, topology_refresh_interval: timedelta,
+            reconciliation_interval: timedelta):
+        super().__init__(logger, ubus_client, topology_refresh_interval)
+        self._logger = logger.getChild('HostapdSubscriptionDeviceProvider')
+        self._reconciliation_interval = reconciliation_interval.total_seconds()
+
+        self._on_change: Callable[[], None] | None = None
+        self._reconciliation_expiry = 0.0
+        self._associations: dict[str, dict[str, Device]] = {}
+        self._subscriptions: dict[str, Task[None]] = {}
+        self._subscribed: set[str] = set()
+        self._authorization_events: set[str] = set()
+
+    async def get(self) -> list[Device]:
+        if self._on_change is not None and monotonic() < self._reconciliation_expiry \
+                and self._subscribed == self._subscriptions.keys():
+            self._logger.debug('Using associations from events')
+            return [device for devices in self._associations.values() for device in devices.values()]
+
+        self._logger.debug('Reconciling associations')
+        devices = await super().get()
+        self._reconciliation_expiry = monotonic() + self._reconciliation_interval
+        if self._on_change is not None:
+            self._update_subscriptions()
+
+        return devices
+
+    async def start(self, on_change: Callable[[], None]) -> None:
+        self._on_change = on_change
+        self._update_subscriptions()
+
+    async def stop(self) -> None:
+        self._on_change = None
+        for subscription in self._subscriptions.values():
+            subscription.cancel()
+
+        self._subscriptions.clear()
+        self._subscribed.clear()
+
+    def _get_devices(self, networks: list[Network], responses: Sequence[Any]) -> list[Device]:
+        self._logger.debug('Getting devices')
+        associations = {}
+        for network, response in zip(networks, responses):
+            if isinstance(response, BaseException):
+                self._logger.warning(f'Could not get clients of network {network.hostapd}, using last known: {response}')
+                associations[network.hostapd] = self._associations.get(network.hostapd, {})
+                continue
+
+            associations[network.hostapd] = {device.mac: device
+                for device in self._get_network_devices(network, response)}
+
+        self._associations = associations
+        return [device for devices in associations.values() for device in devices.values()]
+
+    def _update_subscriptions(self) -> None:
+        for hostapd in [hostapd for hostapd, subscription in self._subscriptions.items() if subscription.done()]:
+            self._logger.debug(f'Subscription to network {hostapd} ended, resubscribing')
+            del self._subscriptions[hostapd]
+
+        hostapds = {network.hostapd for network in self._networks or []}
+        for hostapd in self._subscriptions.keys() - hostapds:
+            self._logger.debug(f'Unsubscribing from network {hostapd}')
+            self._subscriptions.pop(hostapd).cancel()
+            self._subscribed.discard(hostapd)
+
+        for hostapd in hostapds - self._subscriptions.keys():
+            self._subscriptions[hostapd] = create_task(self._subscribe(hostapd))
+
+    async def _subscribe(self, hostapd: str) -> None:
+        backoff = SUBSCRIPTION_BACKOFF_MIN
+        while True:
+            try:
+                async with self._ubus_client.subscribe(hostapd) as events:
+                    self._logger.debug(f'Subscribed to network {hostapd}')
+                    self._subscribed.add(hostapd)
+                    self._reconciliation_expiry = 0.0
+                    backoff = SUBSCRIPTION_BACKOFF_MIN
+
+                    async for event in events:
+                        self._handle_event(hostapd, event)
+            except PermissionError as exception:
+                self._logger.warning(f'Subscription to network {hostapd} denied: {exception}')
+            except (ConnectionError, ValueError) as exception:
+                self._logger.warning(f'Subscription to network {hostapd} lost: {exception}')
+            except Exception as exception:
+                self._logger.exception(f'Subscription to network {hostapd} failed: {exception}')
+            finally:
+                self._subscribed.discard(hostapd)
+
+            await sleep(backoff)
+            backoff = min(backoff * 2, SUBSCRIPTION_BACKOFF_MAX)
+
+    def _handle_event(self, hostapd: str, event: UbusEvent) -> None:
+        network = next((network for network in self._networks or [] if network.hostapd == hostapd), None)
+        address = event.data.get('address')
+        if network is None or address is None:
+            return
+
+        mac = address.upper()
+        devices = self._associations.setdefault(hostapd, {})
+        if event.type == EVENT_AUTHORIZED:
+            self._logger.debug(f'Client {mac} authorized on network {hostapd}')
+            self._authorization_events.add(hostapd)
+            devices[mac] = Device(mac, network.ssid)
+        elif event.type == EVENT_ASSOC:
+            # Clients that associated are not authorized yet, they are added on sta-authorized event. hostapd builds that
+            # do not send it are re-read on the next scan, which only reports clients that are authorized by then
+            if hostapd not in self._authorization_events:
+                self._logger.debug(f'Client {mac} associated with network {hostapd}, reconciling on next scan')
+                self._reconciliation_expiry = 0.0
+            return
+        elif event.type == EVENT_DISASSOC:
+            self._logger.debug(f'Client {mac} disassociated from network {hostapd}')
+            if devices.pop(mac, None) is None:
+                return
+        else:
+            return
+
+        if self._on_change is not None:
+            self._on_change()
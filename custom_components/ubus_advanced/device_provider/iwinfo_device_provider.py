@@ -0,0 +1,100 @@
+# Copyright © 2023 Michał Przybyś <michal@przybys.eu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software
+# and associated documentation files (the “Software”), to deal in the Software without
+# restriction, including without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+# BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from datetime import timedelta
+from logging import Logger
+from time import monotonic
+from typing import Any, NamedTuple, Sequence
+from ..model import Device
+from ..ubus_client import UbusCall, UbusClient
+from .base_device_provider import BaseDeviceProvider
+
+class Interface(NamedTuple):
+    ifname: str
+    ssid: str
+
+class IwinfoDeviceProvider(BaseDeviceProvider):
+    def __init__(self, logger: Logger, ubus_client: UbusClient, topology_refresh_interval: timedelta):
+        self._logger = logger.getChild('IwinfoDeviceProvider')
+        self._ubus_client = ubus_client
+        self._topology_refresh_interval = topology_refresh_interval.total_seconds()
+
+        self._interfaces: list[Interface] | None = None
+        self._interfaces_expiry = 0.0
+
+    async def get(self) -> list[Device]:
+        self._logger.debug('Loading data')
+        interfaces = await self._get_interfaces()
+
+        self._logger.debug(f'Getting clients of {len(interfaces)} Wi-Fi interfaces')
+        responses = await self._get_clients(interfaces)
+        if any(response is None for response in responses):
+            self._logger.info('Wi-Fi interfaces changed, refreshing')
+            self._interfaces = None
+            interfaces = await self._get_interfaces()
+            responses = await self._get_clients(interfaces)
+
+        return self._get_devices(interfaces, responses)
+
+    async def _get_clients(self, interfaces: list[Interface]) -> Sequence[Any]:
+        return await self._ubus_client.batch([UbusCall('iwinfo', 'assoclist', {'device': interface.ifname},
+            self._project_clients) for interface in interfaces], return_exceptions=True, isolated=True)
+
+    @staticmethod
+    def _project_clients(response: dict[str, Any]) -> dict[str, bool]:
+        return {client['mac']: client.get('authorized', True) for client in response['results']}
+
+    async def _get_interfaces(self) -> list[Interface]:
+        if self._interfaces is not None and monotonic() < self._interfaces_expiry:
+            return self._interfaces
+
+        self._logger.debug('Getting Wi-Fi interfaces')
+        radios = await self._ubus_client.call('luci-rpc', 'getWirelessDevices')
+
+        interfaces = []
+        for radio in radios.values():
+            for interface in radio.get('interfaces', []):
+                ifname = interface.get('ifname')
+                config = interface.get('config', {})
+                if ifname is None or config.get('mode') != 'ap':
+                    self._logger.debug(f'Wi-Fi interface {interface.get("section")} is not an active access point, ignoring')
+                    continue
+
+                interfaces.append(Interface(ifname, interface.get('iwinfo', {}).get('ssid') or config.get('ssid')))
+
+        self._interfaces = interfaces
+        self._interfaces_expiry = monotonic() + self._topology_refresh_interval
+
+        self._logger.debug(f'Got {interfaces} Wi-Fi interfaces')
+        return interfaces
+
+    def _get_devices(self, interfaces: list[Interface], responses: Sequence[Any]) -> list[Device]:
+        self._logger.debug('Getting devices')
+        devices = []
+        for interface, response in zip(interfaces, responses):
+            if isinstance(response, BaseException) or response is None:
+                self._logger.warning(f'Could not get clients of Wi-Fi interface {interface.ifname}, ignoring: {response}')
+                continue
+
+            for mac, authorized in response.items():
+                if not authorized:
+                    self._logger.debug(f'Client {mac} not authorized, ignoring')
+                    continue
+
+                devices.append(Device(mac.upper(), interface.ssid))
+
+        self._logger.debug(f'Got {len(devices)} devices')
+        return devices
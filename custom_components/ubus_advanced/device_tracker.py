@@ -14,30 +14,85 @@
 # NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
 # DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-from fnmatch import fnmatch
+from asyncio import Lock, Task, gather, sleep
+from datetime import timedelta
 from homeassistant.components.device_tracker import (
-    DOMAIN,
+    CONF_CONSIDER_HOME,
+    CONF_SCAN_INTERVAL,
     PLATFORM_SCHEMA as DEVICE_TRACKER_PLATFROM_SCHEMA,
-    DeviceScanner
+    SCAN_INTERVAL,
+    AsyncSeeCallback,
+    DeviceScanner,
+    SourceType
 )
-from homeassistant.const import CONF_HOST, CONF_PASSWORD, CONF_USERNAME
-from homeassistant.core import HomeAssistant
+from homeassistant.components.device_tracker.legacy import async_setup_scanner_platform
+from homeassistant.const import (
+    CONF_HOST,
+    CONF_PASSWORD,
+    CONF_USERNAME,
+    EVENT_HOMEASSISTANT_STOP,
+    STATE_NOT_HOME,
+    Platform
+)
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.helpers import config_validation
-from homeassistant.helpers.typing import ConfigType
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.discovery import async_load_platform
+from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
+from hashlib import sha256
+from json import dumps
 from logging import getLogger
-from voluptuous import All, In, Optional, Required
+from time import monotonic
+from typing import Any, Awaitable, Iterable
+from urllib.parse import urlparse
+from voluptuous import All, In, Invalid, Optional, Range, Required, Schema
 from voluptuous.validators import Length
 from .const import *
+from .client_store import ClientStore
+from .device_filter import DeviceFilter
+from .metrics import ScanMetrics
 from .model import Device, Name
-from .name_provider import DnsmasqNameProvider
-from .device_provider import HostapdDeviceProvider
+from .scheduler import PollingScheduler
+from .name_provider import BaseNameProvider, DnsmasqNameProvider, LuciNameProvider
+from .device_provider import (
+    BaseDeviceProvider,
+    HostapdDeviceProvider,
+    HostapdSubscriptionDeviceProvider,
+    IwinfoDeviceProvider
+)
 from .ubus_client import UbusClient
 
-PLATFORM_SCHEMA = DEVICE_TRACKER_PLATFROM_SCHEMA.extend(
+ROUTER_SCHEMA = Schema(
     {
         Required(CONF_HOST): config_validation.url_no_path,
         Required(CONF_USERNAME): config_validation.string,
         Required(CONF_PASSWORD): config_validation.string,
+        Optional(CONF_ROUTER_ROLE, default=ROUTER_ROLE_BOTH): In(ROUTER_ROLES)
+    }
+)
+
+def _validate_routers(config: ConfigType) -> ConfigType:
+    if CONF_ROUTERS in config:
+        if CONF_HOST in config or CONF_USERNAME in config or CONF_PASSWORD in config:
+            raise Invalid(f'{CONF_ROUTERS} cannot be used together with {CONF_HOST}, {CONF_USERNAME} and {CONF_PASSWORD}')
+    else:
+        router = {key: config[key] for key in (CONF_HOST, CONF_USERNAME, CONF_PASSWORD) if key in config}
+        config = {**config, CONF_ROUTERS: [ROUTER_SCHEMA(router)]}
+
+    roles = {router[CONF_ROUTER_ROLE] for router in config[CONF_ROUTERS]}
+    if not roles & {ROUTER_ROLE_DEVICE, ROUTER_ROLE_BOTH}:
+        raise Invalid(f'At least one router needs to have {ROUTER_ROLE_DEVICE} or {ROUTER_ROLE_BOTH} role')
+    if not roles & {ROUTER_ROLE_NAME, ROUTER_ROLE_BOTH}:
+        raise Invalid(f'At least one router needs to have {ROUTER_ROLE_NAME} or {ROUTER_ROLE_BOTH} role')
+
+    return config
+
+PLATFORM_SCHEMA = All(DEVICE_TRACKER_PLATFROM_SCHEMA.extend(
+    {
+        Optional(CONF_HOST): config_validation.url_no_path,
+        Optional(CONF_USERNAME): config_validation.string,
+        Optional(CONF_PASSWORD): config_validation.string,
+        Optional(CONF_ROUTERS): All(config_validation.ensure_list, Length(min=1), [ROUTER_SCHEMA]),
         Optional(CONF_MAC_BLACKLIST, default=[]): All(config_validation.ensure_list, [config_validation.string, config_validation.matches_regex('^[0-9a-fA-F]{2}(:[0-9a-fA-F]{2}){5}$')]),
         Optional(CONF_MAC_WHITELIST, default=[]): All(config_validation.ensure_list, [config_validation.string, config_validation.matches_regex('^[0-9a-fA-F]{2}(:[0-9a-fA-F]{2}){5}$')]),
         Optional(CONF_NAME_BLACKLIST, default=[]): All(config_validation.ensure_list, [config_validation.string]),
@@ -45,77 +100,342 @@ PLATFORM_SCHEMA = DEVICE_TRACKER_PLATFROM_SCHEMA.extend(
         Optional(CONF_SSID_BLACKLIST, default=[]): All(config_validation.ensure_list, [config_validation.string, Length(1, 32)]),
         Optional(CONF_SSID_WHITELIST, default=[]): All(config_validation.ensure_list, [config_validation.string, Length(1, 32)]),
         Optional(CONF_DEVICE_PROVIDER, default=DEVICE_PROVIDER_HOSTAPD): In(DEVICE_PROVIDERS),
-        Optional(CONF_NAME_PROVIDER, default=NAME_PROVIDER_DNSMASQ): In(NAME_PROVIDERS)
+        Optional(CONF_NAME_PROVIDER, default=NAME_PROVIDER_DNSMASQ): In(NAME_PROVIDERS),
+        Optional(CONF_MAX_CONCURRENT_REQUESTS, default=4): All(config_validation.positive_int, Range(min=1)),
+        Optional(CONF_RESPONSE_CACHE_TTL, default=timedelta(seconds=2)): config_validation.positive_time_period,
+        Optional(CONF_TOPOLOGY_REFRESH_INTERVAL, default=timedelta(minutes=10)): config_validation.positive_time_period,
+        Optional(CONF_LEASEFILE_REFRESH_INTERVAL, default=timedelta(minutes=10)): config_validation.positive_time_period,
+        Optional(CONF_RECONCILIATION_INTERVAL, default=timedelta(minutes=5)): config_validation.positive_time_period,
+        Optional(CONF_SENSORS, default=False): config_validation.boolean,
+        Optional(CONF_DELTA_REPORTING, default=False): config_validation.boolean,
+        Optional(CONF_MAX_SCAN_INTERVAL): config_validation.time_period,
+        Optional(CONF_NAME_REFRESH_INTERVAL, default=timedelta(minutes=5)): config_validation.positive_time_period
     }
-)
+), _validate_routers)
 
 class UbusAdvancedDeviceScanner(DeviceScanner): #type: ignore
-    def __init__(self, config: ConfigType):
+    def __init__(self, hass: HomeAssistant, config: ConfigType, async_see: AsyncSeeCallback):
         self._logger = getLogger(__name__)
+        self._hass = hass
+        self._async_see = async_see
+        self.name = urlparse(config[CONF_ROUTERS][0][CONF_HOST]).hostname
+        self.unique_id = self._get_unique_id(config)
+        self.metrics = ScanMetrics()
+
+        self._device_filter = DeviceFilter(self._logger, config[CONF_MAC_BLACKLIST], config[CONF_MAC_WHITELIST],
+            config[CONF_NAME_BLACKLIST], config[CONF_NAME_WHITELIST], config[CONF_SSID_BLACKLIST],
+            config[CONF_SSID_WHITELIST])
+
+        self.ubus_clients: list[UbusClient] = []
+        self._device_providers: list[BaseDeviceProvider] = []
+        self._name_providers: list[BaseNameProvider] = []
+        self._provider_labels: dict[BaseDeviceProvider | BaseNameProvider, str] = {}
+        for router in config[CONF_ROUTERS]:
+            ubus_client = self._get_ubus_client(router, config)
+            self.ubus_clients.append(ubus_client)
+
+            if router[CONF_ROUTER_ROLE] in (ROUTER_ROLE_DEVICE, ROUTER_ROLE_BOTH):
+                if config[CONF_DEVICE_PROVIDER] == DEVICE_PROVIDER_HOSTAPD:
+                    self._device_providers.append(HostapdDeviceProvider(self._logger, ubus_client,
+                        config[CONF_TOPOLOGY_REFRESH_INTERVAL]))
+                elif config[CONF_DEVICE_PROVIDER] == DEVICE_PROVIDER_HOSTAPD_SUBSCRIPTION:
+                    self._device_providers.append(HostapdSubscriptionDeviceProvider(self._logger, ubus_client,
+                        config[CONF_TOPOLOGY_REFRESH_INTERVAL], config[CONF_RECONCILIATION_INTERVAL]))
+                elif config[CONF_DEVICE_PROVIDER] == DEVICE_PROVIDER_IWINFO:
+                    self._device_providers.append(IwinfoDeviceProvider(self._logger, ubus_client,
+                        config[CONF_TOPOLOGY_REFRESH_INTERVAL]))
 
-        self._mac_blacklist = list(map(lambda mac: mac.upper(), config[CONF_MAC_BLACKLIST]))
-        self._mac_whitelist = list(map(lambda mac: mac.upper(), config[CONF_MAC_WHITELIST]))
-        self._name_blacklist = config[CONF_NAME_BLACKLIST]
-        self._name_whitelist = config[CONF_NAME_WHITELIST]
-        self._ssid_blacklist = config[CONF_SSID_BLACKLIST]
-        self._ssid_whitelist = config[CONF_SSID_WHITELIST]
+            if router[CONF_ROUTER_ROLE] in (ROUTER_ROLE_NAME, ROUTER_ROLE_BOTH):
+                if config[CONF_NAME_PROVIDER] == NAME_PROVIDER_DNSMASQ:
+                    self._name_providers.append(DnsmasqNameProvider(self._logger, ubus_client,
+                        config[CONF_LEASEFILE_REFRESH_INTERVAL]))
+                elif config[CONF_NAME_PROVIDER] == NAME_PROVIDER_LUCI:
+                    self._name_providers.append(LuciNameProvider(self._logger, ubus_client))
 
-        self._ubus_client = UbusClient(self._logger, config[CONF_HOST], config[CONF_USERNAME], config[CONF_PASSWORD])
-        self._ubus_client.connect()
+            host = urlparse(router[CONF_HOST]).hostname
+            for provider in (*self._device_providers, *self._name_providers):
+                self._provider_labels.setdefault(provider, f'{host} {provider.__class__.__name__}')
 
-        if config[CONF_DEVICE_PROVIDER] == DEVICE_PROVIDER_HOSTAPD:
-            self._device_provider = HostapdDeviceProvider(self._logger, self._ubus_client)
+        self._client_store = ClientStore(self._logger)
+        self._available: bool | None = None
+        self._device_results: list[Any] = []
+        self._name_results: list[Any] = []
+        self._last_results: dict[BaseDeviceProvider | BaseNameProvider, tuple[float, Any]] = {}
+        self._complete = False
+        self._name_refresh_interval = config[CONF_NAME_REFRESH_INTERVAL].total_seconds()
+        self._names_expiry = 0.0
+        self._names_pending = False
+        self._delta_reporting = config[CONF_DELTA_REPORTING]
+        self._consider_home: timedelta = config[CONF_CONSIDER_HOME]
+        self._refresh_time = 0.0
+        # Devices that are not seen for consider_home are marked as away, so the interval needs to stay well below it
+        max_interval: timedelta = config.get(CONF_MAX_SCAN_INTERVAL, timedelta(0))
+        if max_interval > self._consider_home / 2:
+            self._logger.warning(f'{CONF_MAX_SCAN_INTERVAL} of {max_interval} is longer than half of '
+                f'{CONF_CONSIDER_HOME}, limiting it to {self._consider_home / 2}')
+            max_interval = self._consider_home / 2
+        self._scheduler = PollingScheduler(self._logger, config.get(CONF_SCAN_INTERVAL, SCAN_INTERVAL), max_interval)
+        self._update_lock = Lock()
+        self._push_requested = False
+        self._push_task: Task[None] | None = None
+        self._polling_task: Task[None] | None = None
 
-        if config[CONF_NAME_PROVIDER] == NAME_PROVIDER_DNSMASQ:
-            self._name_provider = DnsmasqNameProvider(self._logger, self._ubus_client)
+    @property
+    def available(self) -> bool:
+        return bool(self._available)
 
-        self._devices: list[str] = []
-        self._names: dict[str, str] = {}
+    async def async_start(self) -> None:
+        await gather(*(device_provider.start(self._request_push) for device_provider in self._device_providers))
 
-    def scan_devices(self) -> list[str]:
+    @callback
+    def async_start_polling(self) -> None:
+        self._polling_task = self._hass.async_create_background_task(self._async_poll_loop(),
+            f'device_tracker {DOMAIN} scan')
+
+    async def async_stop(self, _: Event | None = None) -> None:
+        if self._polling_task is not None:
+            self._polling_task.cancel()
+            self._polling_task = None
+
+        await gather(*(device_provider.stop() for device_provider in self._device_providers))
+
+    async def async_scan_devices(self) -> list[str]:
         self._logger.debug('Scanning for devices')
-        self._update()
+        await self._async_update()
 
-        return list(self._devices)
+        return self._client_store.macs if self.available else []
 
-    def get_device_name(self, mac: str) -> str | None:
+    async def async_get_device_name(self, mac: str) -> str | None:
         self._logger.debug(f'Getting name for {mac} device')
-        return self._names.get(mac)
+        client = self._client_store.get(mac)
 
-    def _update(self) -> None:
-        self._logger.debug('Updating data')
-        devices = [device for device in self._device_provider.get() if self._filter_device(device)]
-        names = [name for name in self._name_provider.get() if self._filter_name(name)]
+        return client.name if client is not None else None
 
-        self._devices = [device.mac for device in devices if any(name.mac == device.mac for name in names)]
-        self._names = {name.mac: name.name for name in names if any(device.mac == name.mac for device in devices)}
+    async def async_get_extra_attributes(self, device: str) -> dict[str, Any]:
+        client = self._client_store.get(device)
 
-    def _filter_device(self, device: Device) -> bool:
-        if self._mac_whitelist and device.mac not in self._mac_whitelist:
-            self._logger.debug(f'Device {device} was not found on MAC address whitelist, ignoring')
-            return False
-        if self._mac_blacklist and device.mac in self._mac_blacklist:
-            self._logger.debug(f'Device {device} was found on MAC address blacklist, ignoring')
-            return False
+        return {'ssid': client.ssid} if client is not None else {}
 
-        if self._ssid_whitelist and device.ssid not in self._ssid_whitelist:
-            self._logger.debug(f'Device {device} was not found on SSID whitelist, ignoring')
-            return False
-        if self._ssid_blacklist and device.ssid in self._ssid_blacklist:
-            self._logger.debug(f'Device {device} was found on SSID blacklist, ignoring')
-            return False
+    async def async_poll(self) -> float:
+        churn = await self._async_update()
+        refresh = self.available and (not self._delta_reporting or monotonic() >= self._refresh_time)
+        if refresh:
+            self._refresh_time = monotonic() + self._consider_home.total_seconds() / 2
 
-        return True
+        await self._async_report(refresh)
 
-    def _filter_name(self, name: Name) -> bool:
-        if self._name_whitelist and not any(fnmatch(name.name, pattern) for pattern in self._name_whitelist):
-            self._logger.debug(f'Name {name} was not found on name whitelist, ignoring')
-            return False
-        if self._name_blacklist and any(fnmatch(name.name, pattern) for pattern in self._name_blacklist):
-            self._logger.debug(f'Name {name} was found on name blacklist, ignoring')
+        return self._scheduler.update(churn)
+
+    async def _async_poll_loop(self) -> None:
+        while True:
+            try:
+                interval = await self.async_poll()
+            except Exception as exception:
+                self._logger.exception(f'Could not scan for devices: {exception}')
+                interval = self._scheduler.interval
+
+            self.metrics.interval = interval
+            await sleep(interval)
+
+    async def _async_update(self) -> bool:
+        async with self._update_lock:
+            self._logger.debug('Updating data')
+            start = monotonic()
+            # Names that are due are requested together with devices, so their requests share one batch
+            name_results: list[Any] | None = None
+            if self._names_pending or monotonic() >= self._names_expiry:
+                device_results, name_results = await self._async_get(self._device_providers, self._name_providers)
+            else:
+                device_results, _ = await self._async_get(self._device_providers, [])
+            available = any(not isinstance(result, BaseException) for result in device_results)
+            if available != self._available:
+                if available:
+                    self._logger.info('Routers are available')
+                else:
+                    self._logger.warning('Could not reach any router, devices are unavailable')
+                self._available = available
+
+            self._complete = all(not isinstance(result, BaseException)
+                for result in (*device_results, *(name_results or [])))
+            if not available:
+                self._client_store.keep()
+                return False
+
+            # Clients of a router that stays unreachable are kept only until they would be considered away
+            device_results = self._reuse(self._device_providers, device_results, self._consider_home.total_seconds())
+            churn = not self._unchanged(device_results, self._device_results)
+
+            if name_results is None and churn:
+                name_results = (await self._async_get([], self._name_providers))[1]
+                self._complete &= all(not isinstance(result, BaseException) for result in name_results)
+            if name_results is None:
+                name_results = self._name_results
+            else:
+                name_results = self._reuse(self._name_providers, name_results, None)
+
+            if not churn and self._unchanged(name_results, self._name_results):
+                self._logger.debug('Data did not change')
+                self.metrics.unchanged += 1
+                self._client_store.keep()
+                self._names_pending = False
+            else:
+                devices: Iterable[Device] = self._merge(device_results)
+                names: Iterable[Name] = self._merge(name_results)
+                unnamed = self._device_filter.unnamed
+                self._client_store.update(self._device_filter.join(devices, names))
+                # Devices that just connected often get their DHCP lease moments later, so names are re-read once more
+                # for them. Devices that still have no lease, like ones with a static IP, wait for name_refresh_interval
+                self._names_pending = bool(self._device_filter.unnamed - unnamed)
+
+            self._device_results = device_results
+            self._name_results = name_results
+            duration = monotonic() - start
+            self.metrics.duration.observe(duration)
+            self._logger.debug(f'Found {len(self._client_store.macs)} devices in {duration:.3f}s')
+
+            return churn
+
+    async def _async_get(self, device_providers: list[BaseDeviceProvider],
+            name_providers: list[BaseNameProvider]) -> tuple[list[Any], list[Any]]:
+        providers = [*device_providers, *name_providers]
+        results = await gather(*(self._timed(provider, provider.get()) for provider in providers),
+            return_exceptions=True)
+        if name_providers:
+            self._names_expiry = monotonic() + self._name_refresh_interval
+
+        return results[:len(device_providers)], results[len(device_providers):]
+
+    def _reuse(self, providers: list[BaseDeviceProvider] | list[BaseNameProvider], results: list[Any],
+            max_age: float | None) -> list[Any]:
+        # A provider that failed contributes its last good result, so a single failed request does not make all of its
+        # devices leave, or lose their names
+        now = monotonic()
+        reused = []
+        for provider, result in zip(providers, results):
+            if not isinstance(result, BaseException):
+                self._last_results[provider] = (now, result)
+                reused.append(result)
+                continue
+
+            label = self._provider_labels[provider]
+            last = self._last_results.get(provider)
+            if last is None:
+                self._logger.warning(f'Could not get data from {label}, ignoring: {result}')
+                reused.append(result)
+            elif max_age is not None and now - last[0] >= max_age:
+                self._logger.warning(f'Could not get data from {label} for {now - last[0]:.0f}s, dropping: {result}')
+                reused.append([])
+            else:
+                self._logger.warning(f'Could not get data from {label}, using last known: {result}')
+                reused.append(last[1])
+
+        return reused
+
+    def _unchanged(self, results: list[Any], previous_results: list[Any]) -> bool:
+        if len(results) != len(previous_results):
             return False
 
-        return True
+        # A provider that failed without any last known result has nothing new to say
+        return all(isinstance(result, BaseException) or result is previous or result == previous
+            for result, previous in zip(results, previous_results))
+
+    async def _timed(self, provider: BaseDeviceProvider | BaseNameProvider, result: Awaitable[Any]) -> Any:
+        start = monotonic()
+        try:
+            return await result
+        finally:
+            self.metrics.observe_provider(self._provider_labels[provider], monotonic() - start)
+
+    def _request_push(self) -> None:
+        self._push_requested = True
+        if self._push_task is None or self._push_task.done():
+            self._push_task = self._hass.async_create_task(self._async_push())
+
+    async def _async_push(self) -> None:
+        while self._push_requested:
+            self._push_requested = False
+            await self._async_update()
+            await self._async_report(False)
+
+    async def _async_report(self, refresh: bool) -> None:
+        joined, left = self._client_store.joined, self._client_store.left
+        if left and not self._complete:
+            # Devices are only reported as away by scans that reached every router, the others expire on consider_home
+            self._logger.debug(f'Not reporting {len(left)} devices as away, some routers could not be reached')
+            left = []
+        if refresh:
+            self._logger.debug('Refreshing all devices')
+            joined = self._client_store.macs
+
+        for mac in joined:
+            client = self._client_store.get(mac)
+            if client is None:
+                continue
+
+            self._logger.debug(f'Device {mac} is home')
+            await self._async_see(mac=mac, host_name=client.name, source_type=SourceType.ROUTER,
+                consider_home=self._consider_home, attributes={'scanner': self.__class__.__name__, 'ssid': client.ssid})
+        for mac in left:
+            self._logger.debug(f'Device {mac} left')
+            await self._async_see(mac=mac, location_name=STATE_NOT_HOME, source_type=SourceType.ROUTER,
+                consider_home=self._consider_home, attributes={'scanner': self.__class__.__name__})
+
+    def _get_unique_id(self, config: ConfigType) -> str:
+        routers = '_'.join(f'{urlparse(router[CONF_HOST]).hostname}_{router[CONF_USERNAME]}'
+            for router in config[CONF_ROUTERS])
+        unique_id = f'{routers}_{config[CONF_DEVICE_PROVIDER]}_{config[CONF_NAME_PROVIDER]}'
+
+        # Trackers of the same routers usually differ only by their filters
+        filters = [config[key] for key in (CONF_MAC_BLACKLIST, CONF_MAC_WHITELIST, CONF_NAME_BLACKLIST,
+            CONF_NAME_WHITELIST, CONF_SSID_BLACKLIST, CONF_SSID_WHITELIST)]
+        if any(filters):
+            unique_id += f'_{sha256(dumps(filters).encode()).hexdigest()[:8]}'
+
+        return unique_id
+
+    def _get_ubus_client(self, router: ConfigType, config: ConfigType) -> UbusClient:
+        ubus_clients: dict[tuple[Any, ...], UbusClient] = self._hass.data.setdefault(DOMAIN, {}) \
+            .setdefault(DATA_UBUS_CLIENTS, {})
+        # Only trackers that would create an identical client share it
+        host = urlparse(router[CONF_HOST])
+        key = (host.scheme.lower(), host.netloc.lower(), router[CONF_USERNAME], router[CONF_PASSWORD],
+            config[CONF_MAX_CONCURRENT_REQUESTS], config[CONF_RESPONSE_CACHE_TTL])
+        ubus_client = ubus_clients.get(key)
+        if ubus_client is None:
+            ubus_client = ubus_clients[key] = UbusClient(getLogger(__name__), async_get_clientsession(self._hass),
+                router[CONF_HOST], router[CONF_USERNAME], router[CONF_PASSWORD], config[CONF_MAX_CONCURRENT_REQUESTS],
+                config[CONF_RESPONSE_CACHE_TTL].total_seconds())
+        else:
+            self._logger.debug(f'Sharing ubus client of {router[CONF_HOST]} with other trackers')
+            ubus_client.shared = True
+
+        return ubus_client
+
+    def _merge(self, results: list[Any]) -> Iterable[Any]:
+        for result in results:
+            if isinstance(result, BaseException):
+                continue
+
+            yield from result
+
+async def async_setup_scanner(hass: HomeAssistant, config: ConfigType, async_see: AsyncSeeCallback,
+        discovery_info: DiscoveryInfoType | None = None) -> bool:
+    scanner = UbusAdvancedDeviceScanner(hass, config, async_see)
+    if config[CONF_DELTA_REPORTING] or CONF_MAX_SCAN_INTERVAL in config:
+        scanner.async_start_polling()
+    else:
+        async_setup_scanner_platform(hass, config, scanner, async_see, DOMAIN)
+    await scanner.async_start()
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, scanner.async_stop)
+
+    if config[CONF_SENSORS]:
+        scanners = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_SCANNERS, {})
+        if scanner.unique_id in scanners:
+            getLogger(__name__).warning(f'Another tracker of {scanner.name} has the same configuration, '
+                'not creating its sensors')
+        else:
+            scanners[scanner.unique_id] = scanner
+            hass.async_create_task(async_load_platform(hass, Platform.SENSOR, DOMAIN,
+                {ATTR_SCANNER_ID: scanner.unique_id}, hass.data[DOMAIN][DATA_HASS_CONFIG]))
 
-def get_scanner(hass: HomeAssistant, config: ConfigType) -> DeviceScanner:
-    return UbusAdvancedDeviceScanner(config[DOMAIN])
+    return True
@@ -0,0 +1,99 @@
+# Copyright © 2023 Michał Przybyś <michal@przybys.eu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software
+# and associated documentation files (the “Software”), to deal in the Software without
+# restriction, including without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+# BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from bisect import bisect_left
+from typing import Any, Final
+
+LATENCY_BUCKETS: Final[tuple[float, ...]] = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.last = 0.0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect_left(self._buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.last = value
+
+    def as_dict(self) -> dict[str, Any]:
+        buckets = {}
+        cumulative = 0
+        for bucket, count in zip(self._buckets + (float('inf'),), self._counts):
+            cumulative += count
+            buckets[f'le_{bucket}'] = cumulative
+
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'last': round(self.last, 6),
+            'buckets': buckets
+        }
+
+class UbusClientMetrics:
+    def __init__(self) -> None:
+        self.latency: dict[str, Histogram] = {}
+        self.response_bytes: dict[str, int] = {}
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.logins = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+
+    @property
+    def total_response_bytes(self) -> int:
+        return sum(self.response_bytes.values())
+
+    def observe(self, method: str, duration: float, size: int) -> None:
+        self.requests += 1
+        self.latency.setdefault(method, Histogram()).observe(duration)
+        self.response_bytes[method] = self.response_bytes.get(method, 0) + size
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'logins': self.logins,
+            'cache_hits': self.cache_hits,
+            'coalesced': self.coalesced,
+            'response_bytes': dict(self.response_bytes),
+            'latency': {method: histogram.as_dict() for method, histogram in self.latency.items()}
+        }
+
+class ScanMetrics:
+    def __init__(self) -> None:
+        self.duration = Histogram()
+        self.provider_latency: dict[str, Histogram] = {}
+        self.unchanged = 0
+        self.interval: float | None = None
+
+    def observe_provider(self, provider: str, duration: float) -> None:
+        self.provider_latency.setdefault(provider, Histogram()).observe(duration)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            'duration': self.duration.as_dict(),
+            'unchanged': self.unchanged,
+            'interval': self.interval,
+            'provider_latency': {provider: histogram.as_dict()
+                for provider, histogram in self.provider_latency.items()}
+        }
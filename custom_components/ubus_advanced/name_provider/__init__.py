@@ -14,8 +14,12 @@
 # NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
 # DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from .base_name_provider import BaseNameProvider
 from .dnsmasq_name_provider import DnsmasqNameProvider
+from .luci_name_provider import LuciNameProvider
 
 __all__ = [
-    'DnsmasqNameProvider'
+    'BaseNameProvider',
+    'DnsmasqNameProvider',
+    'LuciNameProvider'
 ]
@@ -19,5 +19,5 @@ from ..model import Name
 
 class BaseNameProvider(ABC):
     @abstractmethod
-    def get(self) -> list[Name]:
+    async def get(self) -> list[Name]:
         pass
@@ -14,40 +14,136 @@
 # NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
 # DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from datetime import timedelta
 from logging import Logger
+from re import MULTILINE, Pattern, compile
+from sys import intern
+from time import monotonic
+from typing import Any, Final, Iterator, NamedTuple
 from ..model import Name
-from ..ubus_client import UbusClient
+from ..ubus_client import UbusCall, UbusClient
 from .base_name_provider import BaseNameProvider
 
+LEASE_PATTERN: Final[Pattern[str]] = compile(r'^\d+ ([0-9A-Fa-f:]{17}) \S+ (\S+)', MULTILINE)
+
+class LeaseFile(NamedTuple):
+    mtime: int | None
+    size: int | None
+    fingerprint: int
+    names: list[Name]
+
 class DnsmasqNameProvider(BaseNameProvider):
-    def __init__(self, logger: Logger, ubus_client: UbusClient):
+    def __init__(self, logger: Logger, ubus_client: UbusClient, leasefile_refresh_interval: timedelta):
         self._logger = logger.getChild('DnsmasqNameProvider')
         self._ubus_client = ubus_client
+        self._leasefile_refresh_interval = leasefile_refresh_interval.total_seconds()
+
+        self._leasefile_paths: list[str] | None = None
+        self._leasefile_paths_expiry = 0.0
+        self._leasefiles: dict[str, LeaseFile] = {}
+        self._unstattable: set[str] = set()
+        self._names: list[Name] = []
 
-    def get(self) -> list[Name]:
+    async def get(self) -> list[Name]:
         self._logger.debug('Loading data')
-        return self._get_names()
+        return await self._get_names()
 
-    def _get_names(self) -> list[Name]:
-        self._logger.debug('Getting DHCP names')
-        dnsmasqs = self._ubus_client.call('uci', 'get', config='dhcp', type='dnsmasq')['values']
+    async def _get_leasefile_paths(self) -> list[str]:
+        if self._leasefile_paths is not None and monotonic() < self._leasefile_paths_expiry:
+            return self._leasefile_paths
+
+        self._logger.debug('Getting lease files')
+        dhcp = await self._ubus_client.call('uci', 'get', config='dhcp', type='dnsmasq')
+        dnsmasqs = dhcp['values']
 
-        names = []
+        leasefile_paths = []
         for dnsmasq in dnsmasqs:
             leasefile = dnsmasqs[dnsmasq].get('leasefile')
             if leasefile is None:
                 self._logger.debug(f'Dnsmasq {dnsmasq} does not have a leasefile, ignoring')
                 continue
 
-            self._logger.debug(f'Reading {leasefile} lease file')
-            leases = self._ubus_client.call('file', 'read', path=leasefile)
-            if leases is None:
-                self._logger.debug(f'Lease file {leasefile} not found')
+            leasefile_paths.append(leasefile)
+
+        self._leasefile_paths = leasefile_paths
+        self._leasefile_paths_expiry = monotonic() + self._leasefile_refresh_interval
+
+        self._logger.debug(f'Got {leasefile_paths} lease files')
+        return leasefile_paths
+
+    async def _get_names(self) -> list[Name]:
+        self._logger.debug('Getting DHCP names')
+        leasefile_paths = await self._get_leasefile_paths()
+        statted = [leasefile for leasefile in leasefile_paths if leasefile not in self._unstattable]
+        stats = dict(zip(statted, await self._ubus_client.batch([UbusCall('file', 'stat', {'path': leasefile})
+            for leasefile in statted], return_exceptions=True)))
+        failed = [stat for stat in stats.values() if isinstance(stat, ConnectionError)]
+        if failed and len(failed) == len(leasefile_paths):
+            raise failed[0]
+
+        changed = self._leasefiles.keys() != set(leasefile_paths)
+        self._leasefiles = {leasefile: self._leasefiles[leasefile] for leasefile in leasefile_paths
+            if leasefile in self._leasefiles}
+
+        stale: list[tuple[str, dict[str, Any] | None]] = []
+        for leasefile in leasefile_paths:
+            stat = stats.get(leasefile)
+            if isinstance(stat, ConnectionError):
+                self._logger.warning(f'Could not get lease file {leasefile}, using cached one: {stat}')
+                continue
+            if stat is None or isinstance(stat, PermissionError):
+                # Without the list permission rpcd does not stat the file, so it can only be read
+                stale.append((leasefile, None))
                 continue
 
-            for lease in leases['data'].splitlines():
-                _, mac, _, name, _ = lease.split(' ')
-                names.append(Name(mac.upper(), name))
+            cached = self._leasefiles.get(leasefile)
+            if cached is None or cached.mtime != stat['mtime'] or cached.size != stat['size']:
+                stale.append((leasefile, stat))
+
+        if stale:
+            self._logger.debug(f'Reading {[leasefile for leasefile, _ in stale]} lease files')
+            responses = await self._ubus_client.batch([UbusCall('file', 'read', {'path': leasefile})
+                for leasefile, _ in stale], return_exceptions=True)
+            for (leasefile, stat), leases in zip(stale, responses):
+                if isinstance(leases, BaseException):
+                    self._logger.warning(f'Could not read lease file {leasefile}, using cached one: {leases}')
+                    continue
+                if stat is None and leases is not None and leasefile not in self._unstattable:
+                    self._logger.warning(f'Could not stat lease file {leasefile}, reading it on every refresh. '
+                        'Add the list permission for it to the ACL')
+                    self._unstattable.add(leasefile)
+                changed |= self._read_leasefile(leasefile, stat, leases)
+
+        if changed:
+            self._names = [name for leasefile in leasefile_paths if leasefile in self._leasefiles
+                for name in self._leasefiles[leasefile].names]
+
+        self._logger.debug(f'Got {len(self._names)} DHCP names')
+        return self._names
+
+    def _read_leasefile(self, leasefile: str, stat: dict[str, Any] | None, leases: dict[str, Any] | None) -> bool:
+        if leases is None:
+            self._logger.debug(f'Lease file {leasefile} not found')
+            return self._leasefiles.pop(leasefile, None) is not None
+
+        mtime, size = (stat['mtime'], stat['size']) if stat is not None else (None, None)
+        previous = self._leasefiles.get(leasefile)
+        fingerprint = hash(leases['data'])
+        if previous is not None and previous.fingerprint == fingerprint:
+            self._logger.debug(f'Lease file {leasefile} did not change')
+            self._leasefiles[leasefile] = previous._replace(mtime=mtime, size=size)
+            return False
+
+        names = list(self._parse_leases(leases['data'], {name.mac: name for name in previous.names} if previous else {}))
+        self._leasefiles[leasefile] = LeaseFile(mtime, size, fingerprint, names)
+        return True
+
+    def _parse_leases(self, data: str, previous: dict[str, Name]) -> Iterator[Name]:
+        for match in LEASE_PATTERN.finditer(data):
+            mac, hostname = match.groups()
+            mac = mac.upper()
+            name = previous.get(mac)
+            if name is None or name.name != hostname:
+                name = Name(intern(mac), intern(hostname))
 
-        self._logger.debug(f'Got {names} DHCP names')
-        return names
+            yield name
@@ -0,0 +1,44 @@
+# Copyright © 2023 Michał Przybyś <michal@przybys.eu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software
+# and associated documentation files (the “Software”), to deal in the Software without
+# restriction, including without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+# BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from logging import Logger
+from ..model import Name
+from ..ubus_client import UbusClient
+from .base_name_provider import BaseNameProvider
+
+class LuciNameProvider(BaseNameProvider):
+    def __init__(self, logger: Logger, ubus_client: UbusClient):
+        self._logger = logger.getChild('LuciNameProvider')
+        self._ubus_client = ubus_client
+
+    async def get(self) -> list[Name]:
+        self._logger.debug('Loading data')
+        return await self._get_names()
+
+    async def _get_names(self) -> list[Name]:
+        self._logger.debug('Getting DHCP names')
+        leases = await self._ubus_client.call('luci-rpc', 'getDHCPLeases')
+
+        names = []
+        for lease in leases.get('dhcp_leases', []):
+            if not lease.get('hostname') or not lease.get('macaddr'):
+                self._logger.debug(f'Lease {lease} does not have a hostname, ignoring')
+                continue
+
+            names.append(Name(lease['macaddr'].upper(), lease['hostname']))
+
+        self._logger.debug(f'Got {len(names)} DHCP names')
+        return names
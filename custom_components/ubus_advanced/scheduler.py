@@ -0,0 +1,37 @@
+# Copyright © 2023 Michał Przybyś <michal@przybys.eu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software
+# and associated documentation files (the “Software”), to deal in the Software without
+# restriction, including without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+# BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from datetime import timedelta
+from logging import Logger
+from typing import Final
+
+SCHEDULER_BACKOFF_FACTOR: Final[float] = 1.5
+
+class PollingScheduler:
+    def __init__(self, logger: Logger, min_interval: timedelta, max_interval: timedelta):
+        self._logger = logger.getChild('PollingScheduler')
+        self._min_interval = min_interval.total_seconds()
+        self._max_interval = max(max_interval.total_seconds(), self._min_interval)
+
+        self.interval = self._min_interval
+
+    def update(self, churn: bool) -> float:
+        interval = self._min_interval if churn else min(self.interval * SCHEDULER_BACKOFF_FACTOR, self._max_interval)
+        if interval != self.interval:
+            self._logger.debug(f'Changing polling interval from {self.interval:.1f}s to {interval:.1f}s')
+            self.interval = interval
+
+        return interval
@@ -0,0 +1,112 @@
+# Copyright © 2023 Michał Przybyś <michal@przybys.eu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software
+# and associated documentation files (the “Software”), to deal in the Software without
+# restriction, including without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING
+# BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
+from homeassistant.const import UnitOfInformation, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
+from typing import Any
+from urllib.parse import urlparse
+from .const import ATTR_SCANNER_ID, DATA_SCANNERS, DATA_SENSOR_UBUS_CLIENTS, DOMAIN
+from .device_tracker import UbusAdvancedDeviceScanner
+from .ubus_client import UbusClient
+
+class ScanDurationSensor(SensorEntity): #type: ignore
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_suggested_display_precision = 0
+    _unrecorded_attributes = frozenset({'duration', 'provider_latency'})
+
+    def __init__(self, scanner: UbusAdvancedDeviceScanner):
+        self._scanner = scanner
+        self._attr_name = f'Ubus Advanced {scanner.name} scan duration'
+        self._attr_unique_id = f'{DOMAIN}_{scanner.unique_id}_scan_duration'
+
+    @property
+    def available(self) -> bool:
+        return self._scanner.available
+
+    @property
+    def native_value(self) -> float | None:
+        if not self._scanner.metrics.duration.count:
+            return None
+
+        return self._scanner.metrics.duration.last * 1000
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return self._scanner.metrics.as_dict()
+
+class UbusRequestsSensor(SensorEntity): #type: ignore
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _unrecorded_attributes = frozenset({'errors', 'retries', 'logins', 'cache_hits', 'coalesced', 'response_bytes',
+        'latency'})
+
+    def __init__(self, ubus_client: UbusClient):
+        self._ubus_client = ubus_client
+        host = urlparse(ubus_client.url).hostname
+        self._attr_name = f'Ubus Advanced {host} requests'
+        self._attr_unique_id = f'{DOMAIN}_{host}_{ubus_client.username}_requests'
+
+    @property
+    def native_value(self) -> int:
+        return self._ubus_client.metrics.requests
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return self._ubus_client.metrics.as_dict()
+
+class UbusResponseSizeSensor(SensorEntity): #type: ignore
+    _attr_device_class = SensorDeviceClass.DATA_SIZE
+    _attr_native_unit_of_measurement = UnitOfInformation.BYTES
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _unrecorded_attributes = frozenset({'response_bytes'})
+
+    def __init__(self, ubus_client: UbusClient):
+        self._ubus_client = ubus_client
+        host = urlparse(ubus_client.url).hostname
+        self._attr_name = f'Ubus Advanced {host} response size'
+        self._attr_unique_id = f'{DOMAIN}_{host}_{ubus_client.username}_response_size'
+
+    @property
+    def native_value(self) -> int:
+        return self._ubus_client.metrics.total_response_bytes
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return {'response_bytes': dict(self._ubus_client.metrics.response_bytes)}
+
+async def async_setup_platform(hass: HomeAssistant, config: ConfigType, async_add_entities: AddEntitiesCallback,
+        discovery_info: DiscoveryInfoType | None = None) -> None:
+    if discovery_info is None:
+        return
+
+    scanner: UbusAdvancedDeviceScanner = hass.data[DOMAIN][DATA_SCANNERS][discovery_info[ATTR_SCANNER_ID]]
+    sensor_ubus_clients: set[tuple[str | None, str]] = hass.data[DOMAIN].setdefault(DATA_SENSOR_UBUS_CLIENTS, set())
+    entities: list[SensorEntity] = [ScanDurationSensor(scanner)]
+    for ubus_client in scanner.ubus_clients:
+        # Clients of the same router and user, but with different options, share their sensors' unique IDs
+        key = (urlparse(ubus_client.url).hostname, ubus_client.username)
+        if key in sensor_ubus_clients:
+            continue
+
+        sensor_ubus_clients.add(key)
+        entities.append(UbusRequestsSensor(ubus_client))
+        entities.append(UbusResponseSizeSensor(ubus_client))
+
+    async_add_entities(entities)
@@ -14,37 +14,391 @@
 # NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
 # DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from aiohttp import ClientError, ClientResponse, ClientSession, ClientTimeout
+from asyncio import Future, Lock, Semaphore, Task, TimeoutError, create_task, gather, get_running_loop, shield, sleep
+from contextlib import asynccontextmanager
 from logging import Logger
-from openwrt.ubus import Ubus
-from openwrt.ubus.const import API_RPC_CALL, API_RPC_LIST
-from typing import Any, Callable
+from random import uniform
+from time import monotonic
+from typing import Any, AsyncIterator, Awaitable, Callable, Final, Hashable, NamedTuple, Sequence
 from urllib.parse import urlunparse, urlparse
+from .metrics import UbusClientMetrics
+
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+API_DEFAULT_SESSION_ID: Final[str] = '00000000000000000000000000000000'
+API_ERROR_OBJECT_NOT_FOUND: Final[int] = -32000
+API_LOGIN_BACKOFF_MAX: Final[float] = 300.0
+API_LOGIN_BACKOFF_MIN: Final[float] = 5.0
+API_RPC_CALL: Final[str] = 'call'
+API_RPC_LIST: Final[str] = 'list'
+API_RETRIES: Final[int] = 3
+API_RETRY_DELAY: Final[float] = 0.5
+API_RETRY_DELAY_MAX: Final[float] = 5.0
+API_RPC_VERSION: Final[str] = '2.0'
+API_SESSION_RENEWAL_MARGIN: Final[float] = 30.0
+API_SUBSCRIBE_READ_TIMEOUT: Final[float] = 300.0
+API_SUBSCRIBE_TIMEOUT: Final[ClientTimeout] = ClientTimeout(total=None, sock_connect=15,
+    sock_read=API_SUBSCRIBE_READ_TIMEOUT)
+API_TIMEOUT: Final[ClientTimeout] = ClientTimeout(total=15)
+
+class UbusCall(NamedTuple):
+    subsystem: str
+    method: str
+    arguments: dict[str, str] = {}
+    projection: Callable[[Any], Any] | None = None
+
+class UbusList(NamedTuple):
+    subsystem: str
+
+UbusRequest = UbusCall | UbusList
+
+class UbusEvent(NamedTuple):
+    type: str
+    data: dict[str, Any]
+
+class UbusObjectNotFoundError(ConnectionError):
+    pass
+
+class UbusStatusError(ConnectionError):
+    pass
+
+class CachedResponse(NamedTuple):
+    expiry: float
+    result: Any
+
+class PendingRequest(NamedTuple):
+    request: UbusRequest
+    future: Future[Any]
 
 class UbusClient:
-    def __init__(self, logger: Logger, host: str, username: str, password: str):
+    def __init__(self, logger: Logger, session: ClientSession, host: str, username: str, password: str,
+            max_concurrent_requests: int, response_cache_ttl: float):
         self._logger = logger.getChild('UbusClient')
 
         host_parsed = urlparse(host)
-        url = urlunparse((host_parsed.scheme, host_parsed.netloc, '/ubus', '', '', ''))
+        self._url = urlunparse((host_parsed.scheme, host_parsed.netloc, '/ubus', '', '', ''))
+
+        self._session = session
+        self._username = username
+        self._password = password
+        self._session_id = API_DEFAULT_SESSION_ID
+        self._session_timeout = 0.0
+        self._session_expiry = 0.0
+        self._login_lock = Lock()
+        self._login_backoff = API_LOGIN_BACKOFF_MIN
+        self._login_retry_time = 0.0
+        self._rpc_id = 1
+        self._batch_supported = True
+        self._semaphore = Semaphore(max_concurrent_requests)
+        self._response_cache_ttl = response_cache_ttl
+        self.shared = False
+        self._inflight: dict[Hashable, Task[Any]] = {}
+        self._cache: dict[Hashable, CachedResponse] = {}
+        self._pending: list[PendingRequest] = []
+        self._flush_scheduled = False
+        self._flush_tasks: set[Task[None]] = set()
+        self.metrics = UbusClientMetrics()
 
-        self._ubus = Ubus(url, username, password, verify=True)
+    @property
+    def url(self) -> str:
+        return self._url
 
-    def connect(self) -> None:
-        self._logger.info(f'Connecting to ubus {self._ubus.host}')
-        self._ubus.connect()
+    @property
+    def username(self) -> str:
+        return self._username
 
-    def call(self, subsystem: str, method: str, **arguments: str) -> dict[str, Any]:
+    async def call(self, subsystem: str, method: str, **arguments: str) -> Any:
         self._logger.debug(f'Calling method {method} from {subsystem} subsystem with {arguments}')
-        return self._retry(lambda: self._ubus.api_call(API_RPC_CALL, subsystem, method, arguments))
+        request = UbusCall(subsystem, method, arguments)
+        return await self._single_flight(self._key(request), lambda: self._enqueue(request))
 
-    def list(self, subsystem: str) -> dict[str, Any]:
+    async def list(self, subsystem: str) -> Any:
         self._logger.debug(f'Listing subsystem {subsystem}')
-        return self._retry(lambda: self._ubus.api_call(API_RPC_LIST, subsystem))
+        request = UbusList(subsystem)
+        return await self._single_flight(self._key(request), lambda: self._enqueue(request))
+
+    async def batch(self, requests: Sequence[UbusRequest], return_exceptions: bool = False,
+            isolated: bool = False) -> Sequence[Any]:
+        # Isolated requests are sent concurrently, each in its own HTTP request, so that one slow object does not
+        # hold up, or time out, the others
+        self._logger.debug(f'Sending a batch of {len(requests)} {"isolated " if isolated else ""}requests')
+        send = self._send_isolated if isolated else self._enqueue
+        return await gather(*(self._single_flight(self._key(request), lambda request=request: send(request))
+            for request in requests), return_exceptions=return_exceptions)
+
+    async def _send_isolated(self, request: UbusRequest) -> Any:
+        return await self._retry(lambda: self._single(request))
 
-    def _retry(self, callback: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+    def _enqueue(self, request: UbusRequest) -> Future[Any]:
+        # Requests made in the same event loop iteration, also by different providers, are sent in one batch
+        future = get_running_loop().create_future()
+        self._pending.append(PendingRequest(request, future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            task = create_task(self._flush())
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+        return future
+
+    async def _flush(self) -> None:
+        pending, self._pending, self._flush_scheduled = self._pending, [], False
         try:
-            return callback()
-        except PermissionError:
-            self._logger.warning(f'Permission error, possible invalid session, reconnecting...')
-            self.connect()
-            return callback()
+            results = await self._send_batch([item.request for item in pending])
+        except Exception as exception:
+            results = [exception] * len(pending)
+
+        for item, result in zip(pending, results):
+            if item.future.done():
+                continue
+
+            if isinstance(result, BaseException):
+                item.future.set_exception(result)
+            else:
+                item.future.set_result(result)
+
+    async def _send_batch(self, requests: Sequence[UbusRequest]) -> Sequence[Any]:
+        if len(requests) < 2 or not self._batch_supported:
+            return await self._send_single(requests)
+
+        results = await self._retry(lambda: self._batch(requests))
+        if results is None:
+            self._logger.debug('Batch request rejected by ubus, retrying as single requests')
+            results = await self._send_single(requests)
+            if any(not isinstance(result, BaseException) for result in results):
+                self._logger.warning('Batch requests not supported by ubus, falling back to single requests')
+                self._batch_supported = False
+
+        return results
+
+    async def _send_single(self, requests: Sequence[UbusRequest]) -> Sequence[Any]:
+        return await gather(*(self._retry(lambda request=request: self._single(request)) for request in requests),
+            return_exceptions=True)
+
+    @asynccontextmanager
+    async def subscribe(self, subsystem: str) -> AsyncIterator[AsyncIterator[UbusEvent]]:
+        self._logger.debug(f'Subscribing to {subsystem} subsystem')
+        await self._ensure_session()
+        session_id = self._session_id
+        try:
+            async with self._session.get(f'{self._url}/subscribe/{subsystem}',
+                    headers={'Authorization': f'Bearer {session_id}'}, timeout=API_SUBSCRIBE_TIMEOUT) as response:
+                if response.status == 403:
+                    await self._renew(session_id)
+                    raise PermissionError(f'Subscribing to {subsystem} subsystem was denied')
+                if not response.ok:
+                    raise ConnectionError(f'Subscribing to {subsystem} subsystem failed with status {response.status}')
+
+                yield self._events(response)
+        except (ClientError, TimeoutError) as exception:
+            raise ConnectionError(f'Subscription to {subsystem} subsystem failed') from exception
+
+    async def _events(self, response: ClientResponse) -> AsyncIterator[UbusEvent]:
+        event_type = None
+        try:
+            async for line in response.content:
+                field, _, value = line.decode().rstrip('\r\n').partition(':')
+                if field == 'event':
+                    event_type = value.strip()
+                elif field == 'data' and event_type is not None:
+                    data = loads(value)
+                    if not isinstance(data, dict):
+                        raise ValueError(f'Invalid {event_type} event data from ubus {self._url}')
+
+                    yield UbusEvent(event_type, data)
+                elif not field:
+                    event_type = None
+        except TimeoutError:
+            # A connection that silently died never ends the stream, so a long quiet one is ended to be resubscribed
+            self._logger.debug(f'No events from ubus {self._url} for {API_SUBSCRIBE_READ_TIMEOUT:.0f}s, '
+                'ending subscription')
+
+    async def _single_flight(self, key: Hashable, request: Callable[[], Awaitable[Any]]) -> Any:
+        cached = self._cache.get(key) if self.shared else None
+        if cached is not None and monotonic() < cached.expiry:
+            self._logger.debug('Using cached response')
+            self.metrics.cache_hits += 1
+            return cached.result
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = create_task(self._fetch(key, request))
+        else:
+            self._logger.debug('Waiting for an identical request in flight')
+            self.metrics.coalesced += 1
+
+        return await shield(task)
+
+    async def _fetch(self, key: Hashable, request: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            result = await request()
+        finally:
+            del self._inflight[key]
+
+        if self.shared:
+            now = monotonic()
+            self._cache = {cached_key: cached for cached_key, cached in self._cache.items() if now < cached.expiry}
+            self._cache[key] = CachedResponse(now + self._response_cache_ttl, result)
+
+        return result
+
+    def _key(self, request: UbusRequest) -> Hashable:
+        if isinstance(request, UbusList):
+            return request
+
+        return request.subsystem, request.method, frozenset(request.arguments.items()), request.projection
+
+    async def _login(self) -> None:
+        if monotonic() < self._login_retry_time:
+            raise ConnectionError(f'Not connected to ubus {self._url}, '
+                f'next attempt in {self._login_retry_time - monotonic():.0f}s')
+
+        self._logger.info(f'Connecting to ubus {self._url}')
+        start = monotonic()
+        try:
+            login = await self._single(UbusCall('session', 'login',
+                {'username': self._username, 'password': self._password}), API_DEFAULT_SESSION_ID)
+            if login is None or 'ubus_rpc_session' not in login:
+                raise PermissionError(f'Could not log in to ubus {self._url}')
+        except (ConnectionError, PermissionError) as exception:
+            delay = uniform(self._login_backoff / 2, self._login_backoff)
+            self._login_retry_time = monotonic() + delay
+            self._login_backoff = min(self._login_backoff * 2, API_LOGIN_BACKOFF_MAX)
+            self._logger.warning(f'Could not connect to ubus {self._url}, retrying in {delay:.0f}s: {exception}')
+            raise
+
+        self._login_backoff = API_LOGIN_BACKOFF_MIN
+        self._login_retry_time = 0.0
+        self.metrics.logins += 1
+        self._session_id = login['ubus_rpc_session']
+        self._session_timeout = login.get('timeout', float('inf'))
+        self._session_expiry = start + login.get('expires', self._session_timeout)
+        self._logger.debug(f'Logged in, session expires in {self._session_expiry - start}s')
+
+    async def _renew(self, session_id: str) -> None:
+        async with self._login_lock:
+            if self._session_id == session_id:
+                await self._login()
+
+    async def _ensure_session(self) -> None:
+        if monotonic() >= self._session_expiry - API_SESSION_RENEWAL_MARGIN:
+            self._logger.debug('Session is about to expire, renewing')
+            await self._renew(self._session_id)
+
+    async def _single(self, request: UbusRequest, session_id: str | None = None) -> Any:
+        method = request.subsystem if isinstance(request, UbusList) else f'{request.subsystem}.{request.method}'
+        item = await self._post(self._payload(request, session_id), method)
+        if not isinstance(item, dict):
+            raise ConnectionError(f'Invalid response from ubus {self._url}')
+
+        return self._result(request, item)
+
+    async def _batch(self, requests: Sequence[UbusRequest]) -> Sequence[Any] | None:
+        payload = [self._payload(request) for request in requests]
+        ids = {item['id']: index for index, item in enumerate(payload)}
+
+        try:
+            response = await self._post(payload, 'batch')
+        except UbusStatusError as exception:
+            self._logger.debug(f'Batch request failed: {exception}')
+            return None
+        if not isinstance(response, list):
+            return None
+
+        results: list[Any] = [None] * len(requests)
+        for item in response:
+            index = ids[item['id']]
+            try:
+                results[index] = self._result(requests[index], item)
+            except (ConnectionError, PermissionError) as exception:
+                results[index] = exception
+
+        # Items denied by the router's ACL fail on their own, only a batch denied as a whole means the session expired
+        if all(isinstance(result, PermissionError) for result in results):
+            raise results[0]
+
+        return results
+
+    def _payload(self, request: UbusRequest, session_id: str | None = None) -> dict[str, Any]:
+        params: list[Any] = [session_id or self._session_id, request.subsystem]
+        if isinstance(request, UbusCall):
+            params.extend((request.method, request.arguments))
+
+        payload = {
+            'jsonrpc': API_RPC_VERSION,
+            'id': self._rpc_id,
+            'method': API_RPC_LIST if isinstance(request, UbusList) else API_RPC_CALL,
+            'params': params
+        }
+        self._rpc_id += 1
+
+        return payload
+
+    def _result(self, request: UbusRequest, item: dict[str, Any]) -> Any:
+        if 'error' in item:
+            if item['error'].get('message') == 'Access denied':
+                raise PermissionError(item['error']['message'])
+            if item['error'].get('code') == API_ERROR_OBJECT_NOT_FOUND:
+                raise UbusObjectNotFoundError(item['error']['message'])
+
+            raise ConnectionError(item['error']['message'])
+
+        if isinstance(request, UbusList):
+            return item['result']
+        if len(item['result']) < 2:
+            return None
+        # Large results are reduced to the needed fields right after decoding, before they are cached or kept
+        if request.projection is not None:
+            return request.projection(item['result'][1])
+
+        return item['result'][1]
+
+    async def _post(self, payload: dict[str, Any] | Sequence[dict[str, Any]], method: str) -> Any:
+        try:
+            async with self._semaphore:
+                start = monotonic()
+                async with self._session.post(self._url, json=payload, timeout=API_TIMEOUT) as response:
+                    if not response.ok:
+                        raise UbusStatusError(f'Request to ubus {self._url} failed with status {response.status}')
+
+                    body = await response.read()
+                    self.metrics.observe(method, monotonic() - start, len(body))
+
+                    try:
+                        return loads(body)
+                    except ValueError as exception:
+                        raise ConnectionError(f'Invalid response from ubus {self._url}') from exception
+        except (ClientError, TimeoutError) as exception:
+            self.metrics.errors += 1
+            raise ConnectionError(f'Request to ubus {self._url} failed') from exception
+        except ConnectionError:
+            self.metrics.errors += 1
+            raise
+
+    async def _retry(self, callback: Callable[[], Awaitable[Any]]) -> Any:
+        delay = API_RETRY_DELAY
+        for attempt in range(1, API_RETRIES + 1):
+            await self._ensure_session()
+            session_id = self._session_id
+            start = monotonic()
+            try:
+                result = await callback()
+            except PermissionError:
+                if attempt == API_RETRIES:
+                    raise
+
+                self._logger.warning(f'Permission error, possible invalid session, reconnecting (attempt {attempt})...')
+                self.metrics.retries += 1
+                await self._renew(session_id)
+                await sleep(delay)
+                delay = min(delay * 2, API_RETRY_DELAY_MAX)
+                continue
+
+            if self._session_id == session_id:
+                self._session_expiry = start + self._session_timeout
+
+            return result